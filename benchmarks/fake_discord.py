@@ -0,0 +1,140 @@
+import asyncio
+import itertools
+import random
+from typing import Dict, List, Optional
+
+import discord
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from services.channel_health import ChannelHealth
+from services.command_registry import CommandRegistry
+from services.deletions import DeletionQueue
+from services.delivery_journal import DeliveryJournal
+from services.entitlements import PremiumCache
+from services.guild_settings import GuildSettingsCache
+from services.log_sink import LogSink
+from services.lunar_schedule import LunarSchedule
+from services.notifications import GuildNotifier
+from services.shard_gate import ShardGate
+from services.subscriptions import SubscriptionStore
+from services.tombstones import TombstoneRegistry
+from services.webhooks import WebhookRegistry
+
+message_ids = itertools.count(1 << 40)
+
+
+class FakeUser:
+    def __init__(self, user_id: int, name: str):
+        self.id = user_id
+        self.name = name
+        self.mention = f"<@{user_id}>"
+
+
+class FakeRole:
+    def __init__(self, role_id: int):
+        self.id = role_id
+        self.mention = f"<@&{role_id}>"
+
+
+class FakeMessage:
+    def __init__(self, channel_id: int, message_id: Optional[int] = None):
+        self.id = message_id if message_id is not None else next(message_ids)
+        self.channel_id = channel_id
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, shard_count: int, locale: str, member_count: int):
+        self.id = guild_id
+        self.name = f"Guild {guild_id}"
+        self.shard_id = (guild_id >> 22) % shard_count
+        self.preferred_locale = locale
+        self.member_count = member_count
+        self.system_channel = None
+        self.unavailable = False
+        self.me = FakeUser(1, "Bot")
+        self.roles: Dict[int, FakeRole] = {}
+
+    def get_role(self, role_id: int) -> Optional[FakeRole]:
+        return self.roles.get(role_id)
+
+
+class FakeTextChannel(discord.TextChannel):
+    # Subclassed so the isinstance checks in the dispatch code still pass; none of TextChannel's state is used.
+    def __init__(self, channel_id: int, guild: FakeGuild, client: 'FakeClient'):
+        self.id = channel_id
+        self.guild = guild # type: ignore
+        self.name = f"alerts-{channel_id}"
+        self.client = client
+
+    def permissions_for(self, obj) -> discord.Permissions: # type: ignore
+        return discord.Permissions.all()
+
+    async def send(self, content: Optional[str] = None, **kwargs) -> FakeMessage: # type: ignore
+        return await self.client.deliver(self.id, content, kwargs)
+
+
+class FakeClient:
+    """Just enough of OHTimerBot for TimerCog to plan and fan out alerts without a gateway connection."""
+
+    def __init__(self, engine: AsyncEngine, shard_count: int = 1, send_latency: float = 0.0, send_jitter: float = 0.0, http: Optional[discord.http.HTTPClient] = None):
+        self.engine = engine
+        # With an HTTPClient (see benchmarks.fake_rest), sends go through discord.py's real REST and rate-limit handling.
+        self.http = http
+        self.shard_count = shard_count
+        self.send_latency = send_latency
+        self.send_jitter = send_jitter
+        self.user = FakeUser(1, "Bot")
+        self.guild_map: Dict[int, FakeGuild] = {}
+        self.channels: Dict[int, FakeTextChannel] = {}
+        self.sent: List[int] = []
+        self.premium = PremiumCache(self) # type: ignore
+        self.lunar_schedule = LunarSchedule()
+        self.journal = DeliveryJournal(engine)
+        self.webhooks = WebhookRegistry(self, enabled=False) # type: ignore
+        self.deletions = DeletionQueue(self) # type: ignore
+        self.command_registry = CommandRegistry(self) # type: ignore
+        self.notifier = GuildNotifier(self) # type: ignore
+        self.log_sink = LogSink(self) # type: ignore
+        self.channel_health = ChannelHealth(self) # type: ignore
+        self.tombstones = TombstoneRegistry(engine)
+        self.guild_settings = GuildSettingsCache(self) # type: ignore
+        self.subscriptions = SubscriptionStore(engine)
+        self.shard_gate = ShardGate()
+        for shard_id in range(shard_count):
+            self.shard_gate.ready(shard_id)
+
+    @property
+    def guilds(self) -> List[FakeGuild]:
+        return list(self.guild_map.values())
+
+    def add_guild(self, guild_id: int, locale: str = 'en-US', member_count: int = 100) -> FakeGuild:
+        guild = self.guild_map[guild_id] = FakeGuild(guild_id, self.shard_count, locale, member_count)
+        return guild
+
+    def add_channel(self, guild: FakeGuild, channel_id: int) -> FakeTextChannel:
+        channel = self.channels[channel_id] = FakeTextChannel(channel_id, guild, self)
+        return channel
+
+    def get_channel(self, channel_id: int) -> Optional[FakeTextChannel]:
+        return self.channels.get(channel_id)
+
+    def get_guild(self, guild_id: int) -> Optional[FakeGuild]:
+        return self.guild_map.get(guild_id)
+
+    def is_closed(self) -> bool:
+        return False
+
+    async def wait_until_ready(self):
+        return
+
+    async def deliver(self, channel_id: int, content: Optional[str], kwargs: dict) -> FakeMessage:
+        delay = self.send_latency + random.uniform(0, self.send_jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        message_id = None
+        if self.http is not None:
+            with discord.http.handle_message_parameters(content=content, embed=kwargs.get('embed', discord.utils.MISSING)) as params:
+                data = await self.http.send_message(channel_id, params=params)
+            message_id = int(data['id'])
+        self.sent.append(channel_id)
+        return FakeMessage(channel_id, message_id)
@@ -0,0 +1,303 @@
+"""A local stand-in for Discord's REST API with bucket headers, 429s and injected 5xx errors.
+
+Point discord.py at it with `point_discord_at(server.base_url)`, or run it on its own:
+
+    python -m benchmarks.fake_rest --profile realistic --port 8080
+
+`python -m benchmarks.fake_rest --smoke` checks that discord.py can send through it and retries its 429s.
+"""
+import argparse
+import asyncio
+import datetime
+import hashlib
+import itertools
+import json
+import random
+import re
+from collections import Counter
+from time import monotonic, time
+from typing import Any, Dict, List, Optional, Tuple
+
+import discord
+from aiohttp import web
+
+API_PREFIX = '/api/v10'
+MAJOR_PARAMS = re.compile(r'^/(channels|guilds|webhooks)/(\d+)(/[^/]+)?')
+SNOWFLAKE = re.compile(r'/\d{5,}')
+message_ids = itertools.count(1 << 41)
+
+
+class FailureProfile:
+    def __init__(self, route_limit: int = 5, route_window: float = 5.0, global_limit: int = 50, global_429_rate: float = 0.0, server_error_rate: float = 0.0, latency: float = 0.0):
+        self.route_limit = route_limit
+        self.route_window = route_window
+        self.global_limit = global_limit
+        self.global_429_rate = global_429_rate
+        self.server_error_rate = server_error_rate
+        self.latency = latency
+
+
+PROFILES = {
+    'none': FailureProfile(route_limit=1_000_000, global_limit=1_000_000),
+    'realistic': FailureProfile(latency=0.05),
+    'flaky': FailureProfile(server_error_rate=0.02, latency=0.05),
+    'hostile': FailureProfile(route_limit=2, global_limit=20, global_429_rate=0.01, server_error_rate=0.05, latency=0.1),
+    }
+
+
+class RecordedRequest:
+    __slots__ = ('method', 'path', 'bucket', 'status', 'at', 'is_global')
+
+    def __init__(self, method: str, path: str, bucket: str, status: int, at: float, is_global: bool):
+        self.method = method
+        self.path = path
+        self.bucket = bucket
+        self.status = status
+        self.at = at
+        self.is_global = is_global
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'method': self.method, 'path': self.path, 'bucket': self.bucket, 'status': self.status, 'at': self.at, 'global': self.is_global}
+
+
+def json_response(body: Any, status: int, headers: Dict[str, str]) -> web.Response:
+    # discord.py only decodes bodies whose content type is exactly application/json, and web.json_response appends a charset.
+    response = web.Response(body=json.dumps(body).encode('utf-8'), status=status, headers=headers)
+    response.content_type = 'application/json'
+    return response
+
+
+class FakeDiscordServer:
+    def __init__(self, profile: FailureProfile = PROFILES['realistic'], host: str = '127.0.0.1', port: int = 0, seed: Optional[int] = None):
+        self.profile = profile
+        self.host = host
+        self.port = port
+        self.random = random.Random(seed)
+        self.requests: List[RecordedRequest] = []
+        # bucket -> (remaining, monotonic reset time)
+        self.buckets: Dict[str, Tuple[int, float]] = {}
+        self.global_window = (0, 0.0)
+        self.runner: Optional[web.AppRunner] = None
+        self.app = web.Application()
+        self.app.router.add_route('*', API_PREFIX + '/{tail:.*}', self.handle)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}{API_PREFIX}"
+
+    async def start(self):
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        if self.port == 0:
+            self.port = site._server.sockets[0].getsockname()[1] # type: ignore
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def __aenter__(self) -> 'FakeDiscordServer':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def bucket_for(self, method: str, path: str) -> str:
+        major = MAJOR_PARAMS.match(path)
+        major_id = major.group(2) if major else ''
+        template = SNOWFLAKE.sub('/{id}', path)
+        return f"{method} {template} {major_id}"
+
+    def summary(self) -> Dict[str, Any]:
+        statuses = Counter(request.status for request in self.requests)
+        return {
+            'requests': len(self.requests),
+            'statuses': {str(status): count for status, count in sorted(statuses.items())},
+            'global_429s': sum(1 for request in self.requests if request.is_global),
+            'buckets': len({request.bucket for request in self.requests}),
+            }
+
+    def record(self, request: web.Request, path: str, bucket: str, status: int, is_global: bool = False):
+        self.requests.append(RecordedRequest(request.method, path, bucket, status, time(), is_global))
+
+    def rate_limited(self, retry_after: float, bucket_hash: str, is_global: bool) -> web.Response:
+        headers = {
+            'Retry-After': f"{max(1, round(retry_after))}",
+            'X-RateLimit-Scope': 'global' if is_global else 'user',
+            # discord.py treats a 429 without Via as a Cloudflare ban and raises instead of retrying.
+            'Via': '1.1 google',
+            }
+        if is_global:
+            headers['X-RateLimit-Global'] = 'true'
+        else:
+            headers.update({'X-RateLimit-Limit': str(self.profile.route_limit), 'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset-After': f"{retry_after:.3f}", 'X-RateLimit-Reset': f"{time() + retry_after:.3f}", 'X-RateLimit-Bucket': bucket_hash})
+        body = {'message': "You are being rate limited.", 'retry_after': retry_after, 'global': is_global}
+        return json_response(body, 429, headers)
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        path = '/' + request.match_info['tail']
+        bucket = self.bucket_for(request.method, path)
+        bucket_hash = hashlib.sha1(bucket.encode()).hexdigest()[:16]
+        now = monotonic()
+        if self.profile.latency > 0:
+            await asyncio.sleep(self.profile.latency)
+
+        count, window_start = self.global_window
+        if now - window_start >= 1:
+            count, window_start = 0, now
+        count += 1
+        self.global_window = (count, window_start)
+        if count > self.profile.global_limit or self.random.random() < self.profile.global_429_rate:
+            self.record(request, path, bucket, 429, is_global=True)
+            return self.rate_limited(max(0.0, 1 - (now - window_start)), bucket_hash, is_global=True)
+
+        remaining, reset_at = self.buckets.get(bucket, (self.profile.route_limit, now + self.profile.route_window))
+        if now >= reset_at:
+            remaining, reset_at = self.profile.route_limit, now + self.profile.route_window
+        if remaining <= 0:
+            self.buckets[bucket] = (remaining, reset_at)
+            self.record(request, path, bucket, 429)
+            return self.rate_limited(reset_at - now, bucket_hash, is_global=False)
+        remaining -= 1
+        self.buckets[bucket] = (remaining, reset_at)
+
+        headers = {
+            'X-RateLimit-Limit': str(self.profile.route_limit),
+            'X-RateLimit-Remaining': str(remaining),
+            'X-RateLimit-Reset-After': f"{reset_at - now:.3f}",
+            'X-RateLimit-Reset': f"{time() + reset_at - now:.3f}",
+            'X-RateLimit-Bucket': bucket_hash,
+            }
+        if self.random.random() < self.profile.server_error_rate:
+            status = self.random.choice([500, 502, 503, 504])
+            self.record(request, path, bucket, status)
+            return web.Response(status=status, text=f"{status} Service Unavailable", headers=headers)
+
+        status, body = await self.respond(request, path)
+        self.record(request, path, bucket, status)
+        if body is None:
+            return web.Response(status=status, headers=headers)
+        return json_response(body, status, headers)
+
+    async def respond(self, request: web.Request, path: str) -> Tuple[int, Optional[Any]]:
+        if request.method == 'GET' and path == '/users/@me':
+            return 200, self.user_payload()
+        channel_message = re.fullmatch(r'/channels/(\d+)/messages', path)
+        if request.method == 'POST' and channel_message:
+            return 200, self.message_payload(int(channel_message.group(1)), await self.read_payload(request))
+        webhook_message = re.fullmatch(r'/webhooks/(\d+)/[^/]+', path)
+        if request.method == 'POST' and webhook_message:
+            # discord.py sends wait=1, the API docs use wait=true.
+            if request.query.get('wait', 'false').lower() not in ('true', '1'):
+                return 204, None
+            return 200, self.message_payload(0, await self.read_payload(request), webhook_id=int(webhook_message.group(1)))
+        if request.method == 'DELETE':
+            return 204, None
+        return 404, {'message': "Unknown route", 'code': 0}
+
+    async def read_payload(self, request: web.Request) -> Dict[str, Any]:
+        if request.content_type == 'application/json':
+            return await request.json()
+        if request.content_type.startswith('multipart/'):
+            reader = await request.multipart()
+            async for part in reader:
+                if part.name == 'payload_json': # type: ignore
+                    return json.loads(await part.text()) # type: ignore
+        return {}
+
+    def user_payload(self) -> Dict[str, Any]:
+        return {'id': '1', 'username': 'FakeBot', 'discriminator': '0', 'global_name': None, 'avatar': None, 'bot': True}
+
+    def message_payload(self, channel_id: int, payload: Dict[str, Any], webhook_id: Optional[int] = None) -> Dict[str, Any]:
+        message = {
+            'id': str(next(message_ids)),
+            'channel_id': str(channel_id),
+            'author': self.user_payload(),
+            'content': payload.get('content') or '',
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'edited_timestamp': None,
+            'tts': False,
+            'mention_everyone': False,
+            'mentions': [],
+            'mention_roles': [],
+            'attachments': [],
+            'embeds': payload.get('embeds') or [],
+            'pinned': False,
+            'type': 0,
+            }
+        if webhook_id is not None:
+            message['webhook_id'] = str(webhook_id)
+        return message
+
+
+def point_discord_at(base_url: str) -> str:
+    """Send every discord.py REST call to `base_url`; returns the previous base so it can be restored."""
+    previous = discord.http.Route.BASE
+    discord.http.Route.BASE = base_url
+    return previous
+
+
+async def smoke_test():
+    """Send two messages through discord.py's HTTPClient and check the second is retried after a global 429."""
+    # discord.py waits out route buckets from their headers but not the global limit, so two requests a second (the login and
+    # the first message) leave the second message to be rate limited.
+    from services.metrics import RateLimitCounter, RunMetrics, current_run
+    server = FakeDiscordServer(FailureProfile(route_limit=1_000_000, global_limit=2), seed=0)
+    await server.start()
+    previous_base = point_discord_at(server.base_url)
+    http = discord.http.HTTPClient(asyncio.get_running_loop())
+    counter = RateLimitCounter()
+    counter.install()
+    run = RunMetrics('smoke', discord.utils.utcnow())
+    token = current_run.set(run)
+    try:
+        await http.static_login('smoke-token')
+        channel_id = 1 << 40
+        for content in ('first', 'second'):
+            with discord.http.handle_message_parameters(content=content) as params:
+                data = await http.send_message(channel_id, params=params)
+            assert isinstance(data, dict) and int(data['id']), f"Expected a decoded message, got {data!r}"
+        statuses = Counter(request.status for request in server.requests if request.path.endswith('/messages'))
+        assert statuses[200] == 2, f"Expected both messages delivered, got {dict(statuses)}"
+        assert statuses[429] >= 1, f"Expected the second message to hit the global limit, got {dict(statuses)}"
+        assert run.rate_limited == statuses[429], f"Counted {run.rate_limited} rate limits for {statuses[429]} 429s"
+        print(f"Smoke test passed: {dict(statuses)}, {run.rate_limited} rate limit(s) counted.")
+    finally:
+        current_run.reset(token)
+        counter.uninstall()
+        await http.close()
+        await server.stop()
+        point_discord_at(previous_base)
+
+
+async def serve(args: argparse.Namespace):
+    server = FakeDiscordServer(PROFILES[args.profile], host=args.host, port=args.port, seed=args.seed)
+    await server.start()
+    print(f"Fake Discord REST API on {server.base_url} using the {args.profile} profile.  Ctrl+C to stop.")
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print(server.summary())
+    finally:
+        await server.stop()
+        if args.out:
+            with open(args.out, 'w') as f:
+                json.dump({'summary': server.summary(), 'requests': [request.to_dict() for request in server.requests]}, f)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', default='realistic', choices=list(PROFILES))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--out', default=None, help="Write every recorded request here on exit.")
+    parser.add_argument('--smoke', action='store_true', help="Send through the server once, check the 429 retry, and exit.")
+    args = parser.parse_args()
+    try:
+        asyncio.run(smoke_test() if args.smoke else serve(args))
+    except KeyboardInterrupt:
+        pass
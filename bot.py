@@ -9,12 +9,22 @@ from typing import Final, Literal, Optional
 import discord
 from discord.ext import commands
 from dotenv import dotenv_values
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import create_async_engine
 
 from cogs import EXTENSIONS
-from languages import LANGUAGES
-from models.languages import GuildLanguage
+from services.channel_health import ChannelHealth
+from services.deletions import DeletionQueue
+from services.command_registry import CommandRegistry
+from services.database import Database
+from services.delivery_journal import DeliveryJournal
+from services.entitlements import PremiumCache
+from services.guild_settings import GuildSettingsCache
+from services.log_sink import LogSink
+from services.lunar_schedule import LunarSchedule
+from services.notifications import GuildNotifier
+from services.shard_gate import ShardGate
+from services.subscriptions import SubscriptionStore
+from services.tombstones import TombstoneRegistry
+from services.webhooks import WebhookRegistry
 from translations import TRANSLATIONS
 
 config = dotenv_values(".env")
@@ -52,7 +62,8 @@ class OHTimerBot(commands.AutoShardedBot):
         intents = discord.Intents.default()
         self.initial_extensions = EXTENSIONS
         if config["DATABASE_STRING"]:
-            self.engine: Final = create_async_engine(config["DATABASE_STRING"], pool_size=50, max_overflow=10, pool_recycle=30)
+            self.db: Final = Database(config["DATABASE_STRING"])
+            self.engine: Final = self.db.engine
         else:
             print("Please set the DATABASE_STRING value in the .env file and restart the bot.")
             sys.exit(1)
@@ -68,8 +79,42 @@ class OHTimerBot(commands.AutoShardedBot):
             self.testing_guild_id: Final[int] = int(config["TESTING_GUILD_ID"])
         else:
             self.testing_guild = None
+        self.premium: Final = PremiumCache(self)
+        self.lunar_schedule: Final = LunarSchedule()
+        self.journal: Final = DeliveryJournal(self.engine)
+        self.webhooks: Final = WebhookRegistry(self)
+        self.deletions: Final = DeletionQueue(self)
+        self.command_registry: Final = CommandRegistry(self)
+        self.notifier: Final = GuildNotifier(self)
+        self.log_sink: Final = LogSink(self)
+        self.channel_health: Final = ChannelHealth(self)
+        self.shard_gate: Final = ShardGate()
+        self.tombstones: Final = TombstoneRegistry(self.engine)
+        self.guild_settings: Final = GuildSettingsCache(self)
+        self.subscriptions: Final = SubscriptionStore(self.engine)
 
     async def setup_hook(self) -> None:
+        try:
+            await self.premium.resync()
+        except Exception as e:
+            traceback.print_exception(type(e), e, e.__traceback__)
+            print("Failed to load premium entitlements.")
+        try:
+            await self.command_registry.refresh()
+        except Exception as e:
+            traceback.print_exception(type(e), e, e.__traceback__)
+            print("Failed to load application commands.")
+        await self.lunar_schedule.load(self.engine)
+        await self.guild_settings.load()
+        await self.subscriptions.load()
+        await self.journal.setup()
+        await self.webhooks.load()
+        await self.deletions.setup()
+        self.channel_health.load()
+        await self.tombstones.setup()
+        self.deletions.start()
+        self.log_sink.start()
+        self.channel_health.start()
         for extension in self.initial_extensions:
             try:
                 await self.load_extension(extension)
@@ -78,25 +123,60 @@ class OHTimerBot(commands.AutoShardedBot):
                 print(f"Failed to load extension {extension}.")
 
         
+    async def close(self):
+        await self.channel_health.stop()
+        await self.log_sink.stop()
+        # Persist deletions scheduled since the last flush so they survive the restart.
+        await self.deletions.stop()
+        await super().close()
+        # After the gateway closes, so no more deliveries are marked once the journal is written.
+        await self.journal.stop()
+        # Last, since everything above may still write to the database.
+        await self.db.dispose()
+
     async def on_ready(self):
         print(f"Logged in as {self.user.name} | ID# {self.user.id}")
+        self.channel_health.refresh()
 
+    async def on_shard_ready(self, shard_id: int):
+        self.shard_gate.ready(shard_id)
 
-bot = OHTimerBot()
+    async def on_entitlement_create(self, entitlement: discord.Entitlement):
+        self.premium.update(entitlement)
+
+    async def on_entitlement_update(self, entitlement: discord.Entitlement):
+        self.premium.update(entitlement)
+
+    async def on_entitlement_delete(self, entitlement: discord.Entitlement):
+        self.premium.remove(entitlement)
+
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        self.channel_health.check(after)
 
-async def get_language(guild: discord.Guild) -> str:
-    async with bot.engine.begin() as conn:
-        lang = await conn.execute(select(GuildLanguage.lang).filter_by(guild_id=guild.id))
-        lang = lang.one_or_none()
-    if lang is not None:
-        lang = lang.lang
-    if lang is None:
-        lang = LANGUAGES.get(str(guild.preferred_locale).lower(), 'en')
-    return lang
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        self.channel_health.gone(channel.id)
+
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        if before.permissions != after.permissions and (after.is_default() or after in after.guild.me.roles):
+            self.channel_health.check_guild(after.guild)
+
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if after.id == self.user.id and before.roles != after.roles:
+            self.channel_health.check_guild(after.guild)
+
+    async def on_guild_join(self, guild: discord.Guild):
+        # Re-invited before its channels were tombstoned.
+        self.channel_health.check_guild(guild)
+
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.channel_health.remove_guild(guild.id)
+
+
+bot = OHTimerBot()
 
 @bot.tree.error
 async def on_app_command_error(interaction: discord.Interaction, error: discord.app_commands.AppCommandError):
-    dest = await get_language(interaction.guild)
+    dest = await bot.guild_settings.get_language(interaction.guild)
     if isinstance(error, discord.app_commands.CommandOnCooldown):
         retry_time = round(error.retry_after, 0)
         if not interaction.response.is_done():
@@ -138,6 +218,7 @@ async def sync(ctx: commands.Context, guilds: commands.Greedy[discord.Object], s
             synced = []
         else:
             synced = await ctx.bot.tree.sync()
+        await ctx.bot.command_registry.refresh()
 
         msg = await ctx.send(
             f"Synced {len(synced)} commands {'globally' if spec is None else 'to the current guild.'}"
@@ -154,6 +235,7 @@ async def sync(ctx: commands.Context, guilds: commands.Greedy[discord.Object], s
             pass
         else:
             ret += 1
+    await ctx.bot.command_registry.refresh()
 
     msg = await ctx.send(f"Synced the tree to {ret}/{len(guilds)} guilds.")
     await asyncio.sleep(5)
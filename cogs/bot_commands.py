@@ -9,10 +9,8 @@ from googletrans import Translator
 from sqlalchemy import select
 from sqlalchemy.dialects.postgresql import insert
 
-from languages import LANGUAGES
 from models.channels import PremiumMessage
 from models.deviant import Deviants
-from models.languages import GuildLanguage
 from translations import TRANSLATIONS
 
 config = dotenv_values(".env")
@@ -26,43 +24,8 @@ class CommandsCog(commands.Cog):
         self.translator = Translator()
         self.alert_types_list = ['cargo', 'crate', 'purification', 'controller', 'sproutlet', 'medics', 'lunar']
 
-    async def get_language(self, guild: discord.Guild) -> str:
-        async with self.bot.engine.begin() as conn:
-            lang = await conn.execute(select(GuildLanguage.lang).filter_by(guild_id=guild.id))
-            lang = lang.one_or_none()
-        if lang is not None:
-            lang = lang.lang
-        if lang is None:
-            lang = LANGUAGES.get(str(guild.preferred_locale).lower(), 'en')
-        return lang
-
-    async def find_cmd(self, bot: commands.Bot, cmd: str, group: Optional[str] = None):
-        if group is None:
-            command = discord.utils.find(
-                lambda c: c.name.lower() == cmd.lower(),
-                await bot.tree.fetch_commands(),
-            )
-            return command
-        else:
-            cmd_group = discord.utils.find(
-                lambda cg: cg.name.lower() == group.lower(),
-                await bot.tree.fetch_commands(),
-            )
-            for child in cmd_group.options:
-                if child.name.lower() == cmd.lower():
-                    return child
-
-    async def check_if_premium(self, guild: discord.Guild):
-        sku_list = list()
-        is_premium = False
-        skus = await self.bot.fetch_skus()
-        for sku in skus:
-            if sku.id == 1372073760546488391:
-                sku_list.append(sku)
-        ent_list = [ent async for ent in self.bot.entitlements(guild=guild,skus=sku_list,exclude_ended=True)]
-        if len(ent_list) != 0:
-            is_premium = True
-        return is_premium
+    def check_if_premium(self, guild: discord.Guild) -> bool:
+        return self.bot.premium.is_premium(guild.id)
 
     async def alert_type_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
         return [app_commands.Choice(name=alert_type, value=alert_type.lower()) for alert_type in self.alert_types_list if current.lower() in alert_type.lower()]
@@ -75,7 +38,7 @@ class CommandsCog(commands.Cog):
     @app_commands.describe(custom_message="Use %time% to insert the usual timestamp in your message.")
     async def set_premium_messages(self, interaction: discord.Interaction, alert_type: str, custom_message: str):
         custom_message = custom_message.replace(";", ',').replace("\\n", " | ").replace("\\t", " | ").strip()
-        is_premium = await self.check_if_premium(interaction.guild)
+        is_premium = self.check_if_premium(interaction.guild)
         if alert_type.lower() not in self.alert_types_list:
             return await interaction.response.send_message("Please choose a valid alert type from the list provided.", ephemeral=True, delete_after=30)
         if not is_premium:
@@ -85,7 +48,7 @@ class CommandsCog(commands.Cog):
                 premium_message_insert = insert(PremiumMessage).values(guild_id=interaction.guild_id,alert_type=alert_type,message=custom_message)
                 premium_message_update = premium_message_insert.on_conflict_do_update(constraint='premium_messages_guild_alert_constraint', set_={'message': custom_message})
                 await conn.execute(premium_message_update)
-        dest = await self.get_language(interaction.guild)
+        dest = await self.bot.guild_settings.get_language(interaction.guild)
         time_now = discord.utils.utcnow()
         generic_timestamp = int(datetime.datetime.timestamp(time_now))
         embed_titles = {
@@ -114,13 +77,36 @@ class CommandsCog(commands.Cog):
             reset_embed.add_field(name='', value=custom_message.replace('%time%', f'<t:{generic_timestamp}:R>'), inline=False)
         await interaction.followup.send(content=f"You have set the custom message for `{alert_type}` alerts.\nExample alert:", embed=reset_embed)
 
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.command(name='premium_webhook', description='Set the name and avatar your guild\'s alerts are posted with.')
+    @app_commands.allowed_contexts(guilds=True, dms=False, private_channels=False)
+    @app_commands.checks.cooldown(1,5,key=lambda i: (i.guild_id, i.user.id))
+    @app_commands.describe(name="Leave both options empty to go back to the bot's name and avatar.", avatar_url="A direct https:// link to an image.")
+    async def set_premium_webhook(self, interaction: discord.Interaction, name: Optional[app_commands.Range[str, 1, 80]] = None, avatar_url: Optional[str] = None):
+        if not self.check_if_premium(interaction.guild):
+            return await interaction.response.send_message("Please purchase a premium subscription found in the bot's store to use this feature.", ephemeral=True, delete_after=60)
+        # Discord rejects webhook messages whose username contains either of these.
+        if name is not None and any(word in name.lower() for word in ('discord', 'clyde')):
+            return await interaction.response.send_message("The name can't contain `discord` or `clyde`.", ephemeral=True, delete_after=30)
+        if avatar_url is not None and not avatar_url.startswith('https://'):
+            return await interaction.response.send_message("The avatar must be a link starting with `https://`.", ephemeral=True, delete_after=30)
+        await interaction.response.defer()
+        await self.bot.webhooks.set_identity(interaction.guild_id, name, avatar_url)
+        if name is None and avatar_url is None:
+            message = "Your alerts will be posted with the bot's name and avatar."
+        else:
+            message = f"Your alerts will be posted as `{name or self.bot.user.name}`{' with your avatar' if avatar_url is not None else ''}."
+        if not self.bot.webhooks.enabled:
+            message += "\nWebhook delivery isn't turned on for this bot yet, so alerts are still posted by the bot until it is."
+        await interaction.followup.send(content=message)
+
     
     @app_commands.command(name='search_deviant', description='Search the database for a deviant.')
     @app_commands.describe(dev_name='The ENGLISH name of the deviant you are searching for.  Less is more.')
     @app_commands.allowed_contexts(guilds=True, dms=False, private_channels=False)
     @app_commands.checks.cooldown(1, 5, key=lambda i: (i.guild_id, i.user.id))
     async def search_deviant(self, interaction: discord.Interaction, dev_name: str):
-        dest = await self.get_language(interaction.guild)
+        dest = await self.bot.guild_settings.get_language(interaction.guild)
         async with self.bot.engine.begin() as conn:
             deviant = await conn.execute(select(Deviants).filter(Deviants.name.ilike(f"%{dev_name}%")))
             deviant = deviant.first()
@@ -1,23 +1,18 @@
-from typing import Final, Literal, Optional
+from typing import Literal, Optional
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 from dotenv import dotenv_values
-from sqlalchemy import select
 from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy.ext.asyncio import create_async_engine
 
-from languages import LANGUAGES
 from models.channels import AutoDelete, CargoMutes, CargoScrambleChannel
-from models.languages import GuildLanguage
 from translations import TRANSLATIONS
 
 config = dotenv_values(".env")
 
 class CargoMuteSelect(discord.ui.Select):
     def __init__(self):
-        self.engine: Final = create_async_engine(config["DATABASE_STRING"], pool_size=50, max_overflow=10, pool_recycle=30)
         hours = [12,15,18,22]
         options = []
         options.append(discord.SelectOption(label="None", value="None", default=False))
@@ -31,10 +26,12 @@ class CargoMuteSelect(discord.ui.Select):
 
     async def callback(self, interaction: discord.Interaction):
         if len(self.values) == 1 and self.values[0] == "None":
-            async with self.engine.begin() as conn:
+            async with interaction.client.engine.begin() as conn: # type: ignore
                 insert_stmt = insert(CargoMutes).values(guild_id=interaction.guild_id,twelve=False,fifteen=False,twenty_two=False,eighteen_thirty=False)
                 update_stmt = insert_stmt.on_conflict_do_update(constraint='cargo_mutes_unique_guildid', set_={'twelve': False, 'fifteen': False, 'twenty_two': False, 'eighteen_thirty': False})
                 await conn.execute(update_stmt)
+            interaction.client.guild_settings.set_mutes(interaction.guild_id, cargo=frozenset()) # type: ignore
+            interaction.client.subscriptions.set_mutes('cargo', interaction.guild_id, frozenset()) # type: ignore
             return await interaction.response.send_message("No mutes set or all mutes removed.", delete_after=60, ephemeral=True)
         db_dict = {12: 'twelve', 15: 'fifteen', 18: 'eighteen_thirty', 22: 'twenty_two'}
         db_convert = {'twelve': False, 'fifteen': False, 'eighteen_thirty': False, 'twenty_two': False}
@@ -48,10 +45,13 @@ class CargoMuteSelect(discord.ui.Select):
                 muted_values.append(f"`{int(value):02}:00`")
             db_convert[db_dict[int(value)]] = True
         muted_values.sort()
-        async with self.engine.begin() as conn:
+        async with interaction.client.engine.begin() as conn: # type: ignore
             insert_stmt = insert(CargoMutes).values(guild_id=interaction.guild_id,twelve=db_convert['twelve'],fifteen=db_convert['fifteen'],twenty_two=db_convert['twenty_two'],eighteen_thirty=db_convert['eighteen_thirty'])
             update_stmt = insert_stmt.on_conflict_do_update(constraint='cargo_mutes_unique_guildid', set_={'twelve': db_convert['twelve'], 'fifteen': db_convert['fifteen'], 'twenty_two': db_convert['twenty_two'], 'eighteen_thirty': db_convert['eighteen_thirty']})
             await conn.execute(update_stmt)
+        muted_columns = frozenset(column for column, muted in db_convert.items() if muted)
+        interaction.client.guild_settings.set_mutes(interaction.guild_id, cargo=muted_columns) # type: ignore
+        interaction.client.subscriptions.set_mutes('cargo', interaction.guild_id, muted_columns) # type: ignore
         await interaction.response.send_message(f"You have muted {', '.join(muted_values)} UTC.", delete_after=60, ephemeral=True)
 
 class CargoMuteView(discord.ui.View):
@@ -66,33 +66,6 @@ class CargoCog(commands.GroupCog, name='cargo'):
     def __init__(self, bot):
         self.bot = bot
 
-    async def get_language(self, guild: discord.Guild) -> str:
-        async with self.bot.engine.begin() as conn:
-            lang = await conn.execute(select(GuildLanguage.lang).filter_by(guild_id=guild.id))
-            lang = lang.one_or_none()
-        if lang is not None:
-            lang = lang.lang
-        if lang is None:
-            lang = LANGUAGES.get(str(guild.preferred_locale).lower(), 'en')
-        return lang
-
-    async def find_cmd(self, bot: commands.Bot, cmd: str, group: Optional[str] = None):
-        if group is None:
-            command = discord.utils.find(
-                lambda c: c.name.lower() == cmd.lower(),
-                await bot.tree.fetch_commands(),
-            )
-            return command
-        else:
-            cmd_group = discord.utils.find(
-                lambda cg: cg.name.lower() == group.lower(),
-                await bot.tree.fetch_commands(),
-            )
-            for child in cmd_group.options:
-                if child.name.lower() == cmd.lower():
-                    return child 
-
-
     @app_commands.command(name='mute', description='Mute cargo alerts at specific times.')
     @app_commands.checks.cooldown(1, 30, key=lambda i: (i.guild_id, i.user.id))
     async def mute_cargo_alerts(self, interaction: discord.Interaction):
@@ -106,12 +79,12 @@ class CargoCog(commands.GroupCog, name='cargo'):
     @app_commands.describe(asian_server="Toggle to send the alert an hour earlier for Asian servers.")
     async def cargoscramble_alert_setup(self, interaction: discord.Interaction, output_channel: discord.TextChannel, role_to_mention: Optional[discord.Role] = None, asian_server: Optional[bool] = False):
         await interaction.response.defer(ephemeral=True)
-        dest = await self.get_language(interaction.guild)
+        dest = await self.bot.guild_settings.get_language(interaction.guild)
         if not output_channel.permissions_for(output_channel.guild.me).send_messages or not output_channel.permissions_for(output_channel.guild.me).view_channel or not output_channel.permissions_for(output_channel.guild.me).embed_links:
             return await interaction.followup.send(content=TRANSLATIONS[dest]['cargo_channel_alert_error'].format(output_channel.mention), suppress_embeds=True)
         if not type(output_channel) == discord.TextChannel:
-            cargo_cmd = await self.find_cmd(self.bot, cmd='setup', group='cargo')
-            return await interaction.followup.send(content=TRANSLATIONS[dest]['check_channel_type_error'].format(cargo_cmd.mention))
+            cargo_cmd = self.bot.command_registry.mention('setup', group='cargo')
+            return await interaction.followup.send(content=TRANSLATIONS[dest]['check_channel_type_error'].format(cargo_cmd))
         if role_to_mention:
             role_id = role_to_mention.id
         else:
@@ -126,6 +99,9 @@ class CargoCog(commands.GroupCog, name='cargo'):
             cargo_insert = insert(CargoMutes).values(guild_id=interaction.guild_id,twelve=False,fifteen=False,twenty_two=False,eighteen_thirty=False)
             cargo_update = cargo_insert.on_conflict_do_nothing(constraint='cargo_mutes_unique_guildid')
             await conn.execute(cargo_update)
+        settings = await self.bot.guild_settings.get(interaction.guild_id)
+        self.bot.subscriptions.subscribe('cargo', interaction.guild_id, output_channel.id, role_id, auto_delete=settings.auto_delete_cargo, mutes=settings.cargo_mutes, asian_server=asian_server)
+        await self.bot.webhooks.ensure(output_channel)
         try:
             success_embed = discord.Embed(color=discord.Color.green(), description=TRANSLATIONS[dest]['setup_cargo_channel_ping'].format(interaction.user.mention))
             await output_channel.send(embed=success_embed)
@@ -141,6 +117,8 @@ class CargoCog(commands.GroupCog, name='cargo'):
             insert_stmt = insert(AutoDelete).values(guild_id=interaction.guild_id,cargo=auto_dict.get(auto_delete))
             update = insert_stmt.on_conflict_do_update(constraint='auto_delete_unique_guildid', set_={'cargo': auto_dict.get(auto_delete)})
             await conn.execute(update)
+        self.bot.guild_settings.set_auto_delete(interaction.guild_id, cargo=auto_dict.get(auto_delete))
+        self.bot.subscriptions.set_auto_delete('cargo', interaction.guild_id, auto_dict.get(auto_delete))
         if auto_delete == "On":
             enabled = "ENABLED"
         else:
@@ -1,16 +1,12 @@
-from typing import Final, Literal, Optional
+from typing import Literal, Optional
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 from dotenv import dotenv_values
-from sqlalchemy import select
 from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy.ext.asyncio import create_async_engine
 
-from languages import LANGUAGES
 from models.channels import AutoDelete, CrateMutes, CrateRespawnChannel
-from models.languages import GuildLanguage
 from translations import TRANSLATIONS
 
 config = dotenv_values(".env")
@@ -19,7 +15,6 @@ config = dotenv_values(".env")
 class CrateMuteSelect(discord.ui.Select):
     def __init__(self):
         hours = [0,4,8,12,16,20]
-        self.engine: Final = create_async_engine(config["DATABASE_STRING"], pool_size=50, max_overflow=10, pool_recycle=30)
         options = []
         options.append(discord.SelectOption(label="None", value="None", default=False))
         for hour in hours:
@@ -29,10 +24,12 @@ class CrateMuteSelect(discord.ui.Select):
 
     async def callback(self, interaction: discord.Interaction):
         if len(self.values) == 1 and self.values[0] == "None":
-            async with self.engine.begin() as conn:
+            async with interaction.client.engine.begin() as conn: # type: ignore
                 insert_stmt = insert(CrateMutes).values(guild_id=interaction.guild_id,zero=False,four=False,eight=False,twelve=False,sixteen=False,twenty=False)
                 update_stmt = insert_stmt.on_conflict_do_update(constraint='crate_mutes_unique_guildid', set_={'zero': False, 'four': False, 'eight': False, 'twelve': False, 'sixteen': False, 'twenty': False})
                 await conn.execute(update_stmt)
+            interaction.client.guild_settings.set_mutes(interaction.guild_id, crate=frozenset()) # type: ignore
+            interaction.client.subscriptions.set_mutes('crate', interaction.guild_id, frozenset()) # type: ignore
             return await interaction.response.send_message("No mutes set or all mutes removed.", delete_after=60, ephemeral=True)
         db_dict = {0: "zero", 4: "four", 8: "eight", 12: "twelve", 16: "sixteen", 20: "twenty"}
         db_convert = {'zero': False, 'four': False, 'eight': False, 'twelve': False, 'sixteen': False, 'twenty': False, }
@@ -43,10 +40,13 @@ class CrateMuteSelect(discord.ui.Select):
             muted_values.append(f"`{int(value):02}:00`")
             db_convert[db_dict[int(value)]] = True
         muted_values.sort()
-        async with self.engine.begin() as conn:
+        async with interaction.client.engine.begin() as conn: # type: ignore
             insert_stmt = insert(CrateMutes).values(guild_id=interaction.guild_id,zero=db_convert['zero'],four=db_convert['four'],eight=db_convert['eight'],twelve=db_convert['twelve'],sixteen=db_convert['sixteen'],twenty=db_convert['twenty'])
             update_stmt = insert_stmt.on_conflict_do_update(constraint='crate_mutes_unique_guildid', set_={'zero': db_convert['zero'], 'four': db_convert['four'], 'eight': db_convert['eight'], 'twelve': db_convert['twelve'], 'sixteen': db_convert['sixteen'], 'twenty': db_convert['twenty'], })
             await conn.execute(update_stmt)
+        muted_columns = frozenset(column for column, muted in db_convert.items() if muted)
+        interaction.client.guild_settings.set_mutes(interaction.guild_id, crate=muted_columns) # type: ignore
+        interaction.client.subscriptions.set_mutes('crate', interaction.guild_id, muted_columns) # type: ignore
         await interaction.response.send_message(f"You have muted {', '.join(muted_values)} UTC.", delete_after=60, ephemeral=True)
 
 class CrateMuteView(discord.ui.View):
@@ -61,33 +61,6 @@ class CrateCog(commands.GroupCog, name='crate'):
     def __init__(self, bot):
         self.bot = bot
 
-    async def get_language(self, guild: discord.Guild) -> str:
-        async with self.bot.engine.begin() as conn:
-            lang = await conn.execute(select(GuildLanguage.lang).filter_by(guild_id=guild.id))
-            lang = lang.one_or_none()
-        if lang is not None:
-            lang = lang.lang
-        if lang is None:
-            lang = LANGUAGES.get(str(guild.preferred_locale).lower(), 'en')
-        return lang
-
-    async def find_cmd(self, bot: commands.Bot, cmd: str, group: Optional[str] = None):
-        if group is None:
-            command = discord.utils.find(
-                lambda c: c.name.lower() == cmd.lower(),
-                await bot.tree.fetch_commands(),
-            )
-            return command
-        else:
-            cmd_group = discord.utils.find(
-                lambda cg: cg.name.lower() == group.lower(),
-                await bot.tree.fetch_commands(),
-            )
-            for child in cmd_group.options:
-                if child.name.lower() == cmd.lower():
-                    return child 
-
-
     @app_commands.command(name='mute', description='Mute crate alerts at specific times.')
     @app_commands.checks.cooldown(1, 30, key=lambda i: (i.guild_id, i.user.id))
     async def mute_crate_alerts(self, interaction: discord.Interaction):
@@ -100,12 +73,12 @@ class CrateCog(commands.GroupCog, name='crate'):
     @app_commands.describe(role_to_mention="The role you want mentioned in the alert. Blank = None")
     async def crate_alert_setup(self, interaction: discord.Interaction, output_channel: discord.TextChannel, role_to_mention: Optional[discord.Role] = None):
         await interaction.response.defer(ephemeral=True)
-        dest = await self.get_language(interaction.guild)
+        dest = await self.bot.guild_settings.get_language(interaction.guild)
         if not output_channel.permissions_for(output_channel.guild.me).send_messages or not output_channel.permissions_for(output_channel.guild.me).view_channel or not output_channel.permissions_for(output_channel.guild.me).embed_links:
             return await interaction.followup.send(content=TRANSLATIONS[dest]['crate_channel_alert_error'].format(output_channel.mention), suppress_embeds=True)
         if not type(output_channel) == discord.TextChannel:
-            crate_cmd = await self.find_cmd(self.bot, cmd='setup', group='crate')
-            return await interaction.followup.send(content=TRANSLATIONS[dest]['check_channel_type_error'].format(crate_cmd.mention))
+            crate_cmd = self.bot.command_registry.mention('setup', group='crate')
+            return await interaction.followup.send(content=TRANSLATIONS[dest]['check_channel_type_error'].format(crate_cmd))
         if role_to_mention:
             role_id = role_to_mention.id
         else:
@@ -120,6 +93,9 @@ class CrateCog(commands.GroupCog, name='crate'):
             crate_insert = insert(CrateMutes).values(guild_id=interaction.guild_id,zero=False,four=False,eight=False,twelve=False,sixteen=False,twenty=False)
             crate_update = crate_insert.on_conflict_do_nothing(constraint='crate_mutes_unique_guildid')
             await conn.execute(crate_update)
+        settings = await self.bot.guild_settings.get(interaction.guild_id)
+        self.bot.subscriptions.subscribe('crate', interaction.guild_id, output_channel.id, role_id, auto_delete=settings.auto_delete_crate, mutes=settings.crate_mutes)
+        await self.bot.webhooks.ensure(output_channel)
         try:
             success_embed = discord.Embed(color=discord.Color.green(), description=TRANSLATIONS[dest]['setup_crate_channel_ping'].format(interaction.user.mention))
             await output_channel.send(embed=success_embed)
@@ -135,6 +111,8 @@ class CrateCog(commands.GroupCog, name='crate'):
             insert_stmt = insert(AutoDelete).values(guild_id=interaction.guild_id,crate=auto_dict.get(auto_delete))
             update = insert_stmt.on_conflict_do_update(constraint='auto_delete_unique_guildid', set_={'crate': auto_dict.get(auto_delete)})
             await conn.execute(update)
+        self.bot.guild_settings.set_auto_delete(interaction.guild_id, crate=auto_dict.get(auto_delete))
+        self.bot.subscriptions.set_auto_delete('crate', interaction.guild_id, auto_dict.get(auto_delete))
         if auto_delete == "On":
             enabled = "ENABLED"
         else:
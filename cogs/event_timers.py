@@ -8,6 +8,7 @@ from sqlalchemy import delete
 from sqlalchemy.dialects.postgresql import insert
 
 from models.events import Lunar
+from services.lunar_schedule import LUNAR_EVENT_LENGTH
 
 config = dotenv_values(".env")
 
@@ -25,6 +26,8 @@ class GameEventsCog(commands.GroupCog, name='events'):
         await interaction.response.defer(ephemeral=True)
         async with self.bot.engine.begin() as conn:
             await conn.execute(delete(Lunar).where(Lunar.guild_id==interaction.guild_id))
+        self.bot.lunar_schedule.remove_guild(interaction.guild_id)
+        self.bot.subscriptions.remove_guild(interaction.guild_id, ['lunar'])
         await interaction.followup.send(content=f"All event timers removed.")
 
 
@@ -44,10 +47,14 @@ class GameEventsCog(commands.GroupCog, name='events'):
             output_channel = alert_channel
         else:
             output_channel = interaction.channel
+        last_alert = int(discord.utils.utcnow().timestamp())
         async with self.bot.engine.begin() as conn:
-            insert_stmt = insert(Lunar).values(last_alert=int(discord.utils.utcnow().timestamp()),guild_id=interaction.guild_id,channel_id=output_channel.id,role_id=role_id,added_by=interaction.user.id,auto_delete=auto_dict.get(auto_delete))
-            update = insert_stmt.on_conflict_do_update(constraint='event_timers_unique_guild_id', set_={'last_alert': int(discord.utils.utcnow().timestamp()), 'channel_id': output_channel.id, 'role_id': role_id, 'added_by': interaction.user.id, 'auto_delete': auto_dict.get(auto_delete)})
+            insert_stmt = insert(Lunar).values(last_alert=last_alert,guild_id=interaction.guild_id,channel_id=output_channel.id,role_id=role_id,added_by=interaction.user.id,auto_delete=auto_dict.get(auto_delete))
+            update = insert_stmt.on_conflict_do_update(constraint='event_timers_unique_guild_id', set_={'last_alert': last_alert, 'channel_id': output_channel.id, 'role_id': role_id, 'added_by': interaction.user.id, 'auto_delete': auto_dict.get(auto_delete)})
             await conn.execute(update)
+        self.bot.subscriptions.subscribe('lunar', interaction.guild_id, output_channel.id, role_id, auto_delete=auto_dict.get(auto_delete))
+        self.bot.lunar_schedule.schedule(interaction.guild_id, output_channel.id, last_alert + LUNAR_EVENT_LENGTH)
+        await self.bot.webhooks.ensure(output_channel)
         await output_channel.send(f"{interaction.user.mention}, this is where your `Lunar Event` alerts will go.", delete_after=30)
         msg = await interaction.followup.send(content=f"Lunar timer started.\nAlert channel: {alert_channel.mention if alert_channel else interaction.channel.mention}\nAlert role: {role_to_mention.mention if role_to_mention else '`None`'}", silent=True, wait=True)
         await msg.delete(delay=30)
@@ -1,13 +1,10 @@
 import traceback
-from typing import Final, Optional
+from typing import Final
 
 import discord
 from discord import app_commands
 from discord.ext import commands
-from sqlalchemy import select
 
-from languages import LANGUAGES
-from models.languages import GuildLanguage
 from translations import TRANSLATIONS
 
 
@@ -30,7 +27,7 @@ class Feedback(discord.ui.Modal, title='Feedback/Bug Report'):
     )
 
     async def on_submit(self, interaction: discord.Interaction):
-        dest = await self.get_language(interaction.guild)
+        dest = await self.bot.guild_settings.get_language(interaction.guild)
         if self.feedback_type.value.lower() == 'feedback' or self.feedback_type.value.lower() == 'bug':
             feedback_forum: discord.ForumChannel = self.bot.get_channel(int(config['FEEDBACK_CHAN']))  # type: ignore
             if self.feedback_type.value.lower() == 'feedback':
@@ -45,7 +42,7 @@ class Feedback(discord.ui.Modal, title='Feedback/Bug Report'):
             await interaction.response.send_message(content=TRANSLATIONS[dest]['feedback_wrong_choice'].format("Feedback", "Bug"), ephemeral=True, delete_after=30)
 
     async def on_error(self, interaction: discord.Interaction, error: Exception) -> None:
-        dest = await self.get_language(interaction.guild)
+        dest = await self.bot.guild_settings.get_language(interaction.guild)
         traceback.print_exception(type(error), error, error.__traceback__)
         await interaction.response.send_message(TRANSLATIONS[dest]['feedback_error'].format(error), ephemeral=True)
 
@@ -54,32 +51,6 @@ class FeedbackCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    async def get_language(self, guild: discord.Guild) -> str:
-        async with self.bot.engine.begin() as conn:
-            lang = await conn.execute(select(GuildLanguage.lang).filter_by(guild_id=guild.id))
-            lang = lang.one_or_none()
-        if lang is not None:
-            lang = lang.lang
-        if lang is None:
-            lang = LANGUAGES.get(str(guild.preferred_locale).lower(), 'en')
-        return lang
-
-    async def find_cmd(self, bot: commands.Bot, cmd: str, group: Optional[str] = None):
-        if group is None:
-            command = discord.utils.find(
-                lambda c: c.name.lower() == cmd.lower(),
-                await bot.tree.fetch_commands(),
-            )
-            return command
-        else:
-            cmd_group = discord.utils.find(
-                lambda cg: cg.name.lower() == group.lower(),
-                await bot.tree.fetch_commands(),
-            )
-            for child in cmd_group.options:
-                if child.name.lower() == cmd.lower():
-                    return child
-
     @app_commands.command(name='feedback', description='Open a form to provide feedback/a bug report about the bot.')
     @app_commands.allowed_contexts(guilds=True, dms=False, private_channels=False)
     @app_commands.checks.cooldown(1, 1800, key=lambda i: (i.guild_id, i.user.id))
@@ -90,12 +61,12 @@ class FeedbackCog(commands.Cog):
     @app_commands.allowed_contexts(guilds=True, dms=False, private_channels=False)
     @app_commands.checks.cooldown(1, 60, key=lambda i: (i.guild_id, i.user.id))
     async def send_support_embed(self, interaction: discord.Interaction):
-        dest = await self.get_language(interaction.guild)
+        dest = await self.bot.guild_settings.get_language(interaction.guild)
         support_embed = discord.Embed(title=f"{interaction.guild.me.display_name} Quick Support", color=discord.Color.og_blurple(), url="https://discord.mycodeisa.meme")
-        feedback_cmd = await self.find_cmd(self.bot, cmd='feedback')
+        feedback_cmd = self.bot.command_registry.mention('feedback')
         support_embed.add_field(name=TRANSLATIONS[dest]['support_title'], value='https://discord.mycodeisa.meme', inline=False)
         support_embed.add_field(name='', value=TRANSLATIONS[dest]['support_last_update'].format(self.bot.last_update), inline=False)
-        support_embed.add_field(name='', value=TRANSLATIONS[dest]['support_feedback'].format(feedback_cmd.mention), inline=False)
+        support_embed.add_field(name='', value=TRANSLATIONS[dest]['support_feedback'].format(feedback_cmd), inline=False)
         support_embed.add_field(name='', value=TRANSLATIONS[dest]['support_reload'], inline=False)
         support_embed.add_field(name='', value=TRANSLATIONS[dest]['support_permissions'], inline=False)
         support_embed.set_thumbnail(url=self.bot.user.display_avatar.url)
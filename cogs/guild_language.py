@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import List
 
 import discord
 from discord import app_commands
@@ -18,23 +18,6 @@ class GuildLangCog(commands.GroupCog, name='language'):
         self.bot = bot
 
 
-    async def find_cmd(self, bot: commands.Bot, cmd: str, group: Optional[str] = None):
-        if group is None:
-            command = discord.utils.find(
-                lambda c: c.name.lower() == cmd.lower(),
-                await bot.tree.fetch_commands(),
-            )
-            return command
-        else:
-            cmd_group = discord.utils.find(
-                lambda cg: cg.name.lower() == group.lower(),
-                await bot.tree.fetch_commands(),
-            )
-            for child in cmd_group.options:
-                if child.name.lower() == cmd.lower():
-                    return child
-
-
     @app_commands.command(name='set', description='Set the language the bot notifications use to your choice.')
     @app_commands.describe(language="Type your language.")
     @app_commands.checks.cooldown(1, 300, key=lambda i: (i.guild_id, i.user.id))
@@ -80,6 +63,7 @@ class GuildLangCog(commands.GroupCog, name='language'):
             insert_stmt = insert(GuildLanguage).values(guild_id=interaction.guild_id, lang=lang, added_by=interaction.user.id)
             update = insert_stmt.on_conflict_do_update(constraint='guild_lang_unique_guildid', set_={'lang': lang, 'added_by': interaction.user.id})
             await conn.execute(update)
+        self.bot.guild_settings.set_language(interaction.guild_id, lang)
         return await interaction.followup.send(f"Language set to `{language}` for this guild.")
 
     @set_language.autocomplete('language')
@@ -127,6 +111,7 @@ class GuildLangCog(commands.GroupCog, name='language'):
         async with self.bot.engine.begin() as conn:
             delete_stmt = delete(GuildLanguage).filter_by(guild_id=interaction.guild_id)
             await conn.execute(delete_stmt)
+        self.bot.guild_settings.set_language(interaction.guild_id, None)
         return await interaction.followup.send("Removed any set language for this guild.")
         
 
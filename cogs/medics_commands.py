@@ -4,12 +4,9 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from dotenv import dotenv_values
-from sqlalchemy import select
 from sqlalchemy.dialects.postgresql import insert
 
-from languages import LANGUAGES
 from models.channels import Medics
-from models.languages import GuildLanguage
 from translations import TRANSLATIONS
 
 config = dotenv_values(".env")
@@ -20,45 +17,18 @@ class MedicsCog(commands.GroupCog, name='medics'):
     def __init__(self, bot):
         self.bot = bot
 
-    async def get_language(self, guild: discord.Guild) -> str:
-        async with self.bot.engine.begin() as conn:
-            lang = await conn.execute(select(GuildLanguage.lang).filter_by(guild_id=guild.id))
-            lang = lang.one_or_none()
-        if lang is not None:
-            lang = lang.lang
-        if lang is None:
-            lang = LANGUAGES.get(str(guild.preferred_locale).lower(), 'en')
-        return lang
-
-    async def find_cmd(self, bot: commands.Bot, cmd: str, group: Optional[str] = None):
-        if group is None:
-            command = discord.utils.find(
-                lambda c: c.name.lower() == cmd.lower(),
-                await bot.tree.fetch_commands(),
-            )
-            return command
-        else:
-            cmd_group = discord.utils.find(
-                lambda cg: cg.name.lower() == group.lower(),
-                await bot.tree.fetch_commands(),
-            )
-            for child in cmd_group.options:
-                if child.name.lower() == cmd.lower():
-                    return child 
-
-
     @app_commands.command(name='setup', description='Setup for Medic/Trunk alerts.')
     @app_commands.describe(output_channel="The text/announcement channel you want notifications in.")
     @app_commands.describe(role_to_mention="The role you want mentioned in the alert. Blank = None")
     async def cargoscramble_alert_setup(self, interaction: discord.Interaction, output_channel: discord.TextChannel, role_to_mention: Optional[discord.Role] = None, auto_delete: Optional[Literal['On', 'Off']] = 'Off'):
         await interaction.response.defer(ephemeral=True)
         auto_dict = {"On": True, "Off": False}
-        dest = await self.get_language(interaction.guild)
+        dest = await self.bot.guild_settings.get_language(interaction.guild)
         if not output_channel.permissions_for(output_channel.guild.me).send_messages or not output_channel.permissions_for(output_channel.guild.me).view_channel or not output_channel.permissions_for(output_channel.guild.me).embed_links:
             return await interaction.followup.send(content=TRANSLATIONS[dest]['medics_channel_alert_error'].format(output_channel.mention), suppress_embeds=True)
         if not type(output_channel) == discord.TextChannel:
-            medics_cmd = await self.find_cmd(self.bot, cmd='setup', group='medic')
-            return await interaction.followup.send(content=TRANSLATIONS[dest]['check_channel_type_error'].format(medics_cmd.mention))
+            medics_cmd = self.bot.command_registry.mention('setup', group='medic')
+            return await interaction.followup.send(content=TRANSLATIONS[dest]['check_channel_type_error'].format(medics_cmd))
         if role_to_mention:
             role_id = role_to_mention.id
         else:
@@ -67,6 +37,8 @@ class MedicsCog(commands.GroupCog, name='medics'):
             insert_stmt = insert(Medics).values(auto_delete=auto_dict.get(auto_delete),guild_id=interaction.guild_id,channel_id=output_channel.id,role_id=role_id,added_by=interaction.user.id)
             update = insert_stmt.on_conflict_do_update(constraint='medics_unique_guildid', set_={'auto_delete': auto_dict.get(auto_delete), 'channel_id': output_channel.id, 'role_id': role_id, 'added_by': interaction.user.id})
             await conn.execute(update)
+        self.bot.subscriptions.subscribe('medics', interaction.guild_id, output_channel.id, role_id, auto_delete=auto_dict.get(auto_delete))
+        await self.bot.webhooks.ensure(output_channel)
         await output_channel.send(content=TRANSLATIONS[dest]['setup_medics_channel_ping'].format(interaction.user.mention))
         return await interaction.followup.send(content=TRANSLATIONS[dest]['setup_medics_success'].format(output_channel.mention, role_to_mention.mention if role_to_mention else '`None`'), suppress_embeds=True)
 
@@ -1,8 +1,9 @@
+import asyncio
 import datetime
-import random
+import io
 import traceback
 from time import perf_counter
-from typing import Final, Optional
+from typing import Any, Dict, Final, List, Optional, Set, Tuple
 
 import discord
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
@@ -11,15 +12,18 @@ from apscheduler.triggers.cron import CronTrigger
 from discord import app_commands
 from discord.ext import commands
 from dotenv import dotenv_values
-from sqlalchemy import delete, select, update
+from sqlalchemy import BigInteger, any_, delete, literal, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
 
-from languages import LANGUAGES
-from models.channels import (AutoDelete, CargoMutes, CargoScrambleChannel,
-                             CrateMutes, CrateRespawnChannel, Medics,
-                             PremiumMessage)
+from models.channels import (CargoScrambleChannel, CrateRespawnChannel,
+                             Medics, PremiumMessage)
 from models.events import Lunar
-from models.languages import GuildLanguage
 from models.weekly_resets import Controller, Purification, Sproutlet
+from services.channel_health import subscription_table
+from services.dispatcher import AlertDispatcher, AlertPlan, PlannedAlert, shard_for
+from services.lunar_schedule import LUNAR_EVENT_LENGTH
+from services.metrics import AlertMetrics, RateLimitCounter, format_summary
+from services.tombstones import TOMBSTONE_MISSES
 from translations import TRANSLATIONS
 
 config = dotenv_values(".env")
@@ -29,15 +33,50 @@ def me_only(interaction: discord.Interaction) -> bool:
     return interaction.user.id == int(config["MY_USER_ID"]) # type: ignore
 
 MY_GUILD_ID = discord.Object(int(config["TESTING_GUILD_ID"])) # type: ignore
-LUNAR_EVENT_LENGTH = 3600
+LUNAR_FLUSH_CHUNK = 5000
+PREFIRE_WINDOW = datetime.timedelta(minutes=3)
+PLAN_TOLERANCE = 60
+# How long after the fire time to keep waiting for shards that are still loading their guilds, in seconds.
+SHARD_READY_DEADLINE = 180
+ALERT_TABLES = {
+    'cargo': CargoScrambleChannel,
+    'asian_server_cargo': CargoScrambleChannel,
+    'crate': CrateRespawnChannel,
+    'purification': Purification,
+    'controller': Controller,
+    'sproutlet': Sproutlet,
+    'medics': Medics,
+    'lunar': Lunar,
+    }
+EMBED_TITLE_KEYS = {
+    'cargo': 'cargo_embed_title',
+    'asian_server_cargo': 'cargo_embed_title',
+    'crate': 'crate_embed_title',
+    'purification': 'purification_embed_title',
+    'controller': 'controller_embed_title',
+    'sproutlet': 'sproutlet_embed_title',
+    'medics': 'medics_embed_title',
+    'lunar': 'lunar_embed_title',
+    }
+# How long after its scheduled time an interrupted run is still worth finishing, in seconds.
+RESUME_WINDOWS = {'cargo': 300, 'asian_server_cargo': 300, 'crate': 3600, 'purification': 7200, 'controller': 7200, 'sproutlet': 1800, 'medics': 3600}
 
 
 class TimerCog(commands.Cog):
     def __init__(self, bot):
         self.bot: Final[commands.Bot] = bot
         self.scheduler: Final = AsyncIOScheduler(timezone=datetime.timezone.utc)
+        self.dispatcher: Final = AlertDispatcher()
+        self.plans: Dict[str, AlertPlan] = {}
+        # Serializes preparing and firing each alert type, so a run never ends up with two plans and two journal runs.
+        self.plan_locks: Dict[str, asyncio.Lock] = {}
+        # When each alert type last picked up its plan, so a prepare that started before the fire can tell it is stale.
+        self.fired: Dict[str, datetime.datetime] = {}
+        self.metrics: Final = AlertMetrics()
+        self.rate_limit_counter: Final = RateLimitCounter()
 
     def cog_load(self):
+        self.rate_limit_counter.install()
         if not self.scheduler.running:
             
             # Crate alerts - every 4 hours
@@ -70,279 +109,300 @@ class TimerCog(commands.Cog):
             # Lunar event alert - every minute
             self.scheduler.add_job(self.generate_alert, 'cron', name='lunar_alert', args=['lunar'], coalesce=True, second=0)
 
+            # Build dispatch plans for alerts firing in the next few minutes
+            self.scheduler.add_job(self.prepare_plans, 'interval', name='prepare_plans', minutes=1)
+
+            # Finish any alert runs interrupted by a restart
+            self.scheduler.add_job(self.resume_runs, name='resume_runs')
+
             # Update the # of servers every 6 minutes
             self.scheduler.add_job(self.update_stats, 'interval', name='update_stats', minutes=6)
 
+            # Resync premium entitlements every 30 minutes in case a gateway event was missed
+            self.scheduler.add_job(self.bot.premium.resync, 'interval', name='premium_resync', minutes=30) # type: ignore
+
             self.scheduler.start()
 
     def cog_unload(self) -> None:
+        self.rate_limit_counter.uninstall()
         self.scheduler.remove_all_jobs()
         self.scheduler.shutdown(wait=False)
 
-    async def get_language(self, guild: discord.Guild) -> str:
-        async with self.bot.engine.begin() as conn: # type: ignore
-            lang = await conn.execute(select(GuildLanguage.lang).filter_by(guild_id=guild.id))
-            lang = lang.one_or_none()
-        if lang is not None:
-            lang = lang.lang
-        if lang is None:
-            lang = LANGUAGES.get(str(guild.preferred_locale).lower(), 'en')
-        return lang
-
-    async def find_cmd(self, bot: commands.Bot, cmd: str, group: Optional[str] = None):
-        if group is None:
-            command = discord.utils.find(
-                lambda c: c.name.lower() == cmd.lower(),
-                await bot.tree.fetch_commands(),
-            )
-            return command
-        else:
-            cmd_group = discord.utils.find(
-                lambda cg: cg.name.lower() == group.lower(),
-                await bot.tree.fetch_commands(),
-            )
-            for child in cmd_group.options: # type: ignore
-                if child.name.lower() == cmd.lower():
-                    return child
-                else:
-                    continue
-
     async def update_stats(self):
         stats_chan: discord.VoiceChannel = self.bot.get_channel(int(config["COUNT_CHAN"])) # type: ignore
         if stats_chan.name == f'🛜 {len(self.bot.guilds):,} Servers':
             pass
         await stats_chan.edit(name=f'🛜 {len(self.bot.guilds):,} Servers')
 
-    async def send_log(self, type: str, alert_type: str, message: str, silent: bool = False) -> discord.Message:
-        log_channel: discord.TextChannel = self.bot.get_channel(int(config["LOG_CHAN"])) # type: ignore
-        log_embed = discord.Embed(description=message[:-4096])
-        log_embed.title = ""
-        if type == 'error':
-            log_embed.color = discord.Color.red()
-            log_embed.title = f"Error"
-        elif type == 'warn':
-            log_embed.color = discord.Color.orange()
-            log_embed.title = f"Warning"
-        elif type == 'info':
-            log_embed.color = discord.Color.blue()
-            log_embed.title = f"Info"
-        log_embed.title += f" - {alert_type.upper()}"
-        if alert_type == 'sproutlet':
-            silent = True
-        return await log_channel.send(embed=log_embed, silent=silent)
-
-    async def purge_channel(self, alert_type: str, channel_id: int):
+    async def send_log(self, type: str, alert_type: str, message: str, silent: bool = False, file: Optional[discord.File] = None, error: Optional[BaseException] = None):
+        # Buffered and grouped by the log sink, so alert runs never wait on the log channel.
+        self.bot.log_sink.log(type, alert_type, message, silent=silent, file=file, error=error) # type: ignore
+
+    async def purge_channels(self, alert_type: str, purged: List[Tuple[int, str]]):
+        channel_ids = [channel_id for channel_id, _ in purged]
+        table = ALERT_TABLES[alert_type]
         async with self.bot.engine.begin() as conn: # type: ignore
-            if alert_type == 'cargo':
-                await conn.execute(delete(CargoScrambleChannel).filter_by(channel_id=channel_id))
-            elif alert_type == 'asian_server_cargo':
-                await conn.execute(delete(CargoScrambleChannel).filter_by(channel_id=channel_id))
-            elif alert_type == 'crate':
-                await conn.execute(delete(CrateRespawnChannel).filter_by(channel_id=channel_id))
-            elif alert_type == 'purification':
-                await conn.execute(delete(Purification).filter_by(channel_id=channel_id))
-            elif alert_type == 'controller':
-                await conn.execute(delete(Controller).filter_by(channel_id=channel_id))
-            elif alert_type == 'sproutlet':
-                await conn.execute(delete(Sproutlet).filter_by(channel_id=channel_id))
-            elif alert_type == 'medics':
-                await conn.execute(delete(Medics).filter_by(channel_id=channel_id))
-            elif alert_type == 'lunar':
-                await conn.execute(delete(Lunar).filter_by(channel_id=channel_id))
-        await self.send_log('error', alert_type, f"Deleted {channel_id} due to channel not found.")
+            await conn.execute(delete(table).where(table.channel_id == any_(literal(channel_ids, ARRAY(BigInteger)))))
+        await self.bot.webhooks.discard(channel_ids) # type: ignore
+        self.bot.channel_health.forget(channel_ids) # type: ignore
+        self.bot.subscriptions.remove_channels(subscription_table(alert_type), channel_ids) # type: ignore
+        report = "\n".join(f"{channel_id}: {reason}" for channel_id, reason in purged)
+        summary = f"Deleted {len(purged)} channel{'s' if len(purged) != 1 else ''} from `{table.__tablename__}`.\n\n{report}"
+        if len(summary) <= 4096:
+            await self.send_log('error', alert_type, summary)
+        else:
+            report_file = discord.File(io.BytesIO(report.encode('utf-8')), filename=f"{alert_type}_purged_channels.txt")
+            await self.send_log('error', alert_type, f"Deleted {len(purged)} channels from `{table.__tablename__}`.  Full list attached.", file=report_file)
+
+    async def flush_lunar_alerts(self, channel_ids: List[int], last_alert: int):
+        async with self.bot.engine.begin() as conn: # type: ignore
+            for i in range(0, len(channel_ids), LUNAR_FLUSH_CHUNK):
+                chunk = channel_ids[i:i+LUNAR_FLUSH_CHUNK]
+                await conn.execute(update(Lunar).where(Lunar.channel_id == any_(literal(chunk, ARRAY(BigInteger)))).values(last_alert=last_alert))
+
+    async def reschedule_lunar(self, plan: AlertPlan, delivered: List[int], now: int):
+        dropped = {channel_id for channel_id, _ in plan.purged}
+        for channel_id in plan.lunar_due:
+            if channel_id in dropped or channel_id not in plan.found:
+                self.bot.lunar_schedule.remove(channel_id) # type: ignore
+        self.bot.lunar_schedule.reschedule(delivered, now + LUNAR_EVENT_LENGTH) # type: ignore
+        # Missing channels count one miss per event rather than one per tick.
+        missing = set(plan.missing) - dropped
+        self.bot.lunar_schedule.reschedule(missing, now + LUNAR_EVENT_LENGTH) # type: ignore
+        # Failed and deferred sends stay due and are retried on the next tick.
+        self.bot.lunar_schedule.reschedule(plan.found - dropped - set(delivered) - missing, now) # type: ignore
+        if delivered:
+            await self.flush_lunar_alerts(delivered, now)
+
+    def plan_lock(self, alert_type: str) -> asyncio.Lock:
+        lock = self.plan_locks.get(alert_type)
+        if lock is None:
+            lock = self.plan_locks[alert_type] = asyncio.Lock()
+        return lock
+
+    async def prepare_plans(self):
+        time_now = discord.utils.utcnow()
+        for alert_type, plan in list(self.plans.items()):
+            if (time_now - plan.fire_time).total_seconds() <= PLAN_TOLERANCE:
+                continue
+            # Its job never picked it up, so nothing else would close its journal run.
+            async with self.plan_lock(alert_type):
+                if self.plans.get(alert_type) is plan:
+                    del self.plans[alert_type]
+                    await self.close_journal(plan)
+        for job in self.scheduler.get_jobs():
+            if job.func != self.generate_alert or not job.args or job.args[0] == 'lunar' or job.next_run_time is None:
+                continue
+            alert_type = job.args[0]
+            fire_time = job.next_run_time
+            if fire_time - time_now > PREFIRE_WINDOW:
+                continue
+            async with self.plan_lock(alert_type):
+                fired = self.fired.get(alert_type)
+                if fired is not None and abs((fired - fire_time).total_seconds()) <= PLAN_TOLERANCE:
+                    # The job fired before this prepare got the lock and built its own plan.
+                    continue
+                plan = self.plans.get(alert_type)
+                if plan is not None and plan.fire_time == fire_time:
+                    continue
+                try:
+                    if plan is not None:
+                        del self.plans[alert_type]
+                        await self.close_journal(plan)
+                    plan = await self.build_plan(alert_type, fire_time)
+                    await self.open_journal(plan)
+                    self.plans[alert_type] = plan
+                except Exception as e:
+                    traceback.print_exception(type(e), e, e.__traceback__)
+
+    async def open_journal(self, plan: AlertPlan):
+        if not plan.entries and not plan.deferred:
+            return
+        try:
+            plan.run_id = await self.bot.journal.open_run(plan.alert_type, plan.fire_time, [entry.channel_id for entry in plan.entries] + list(plan.deferred)) # type: ignore
+        except Exception as e:
+            # The journal only protects against restarts, so never hold up an alert for it.
+            traceback.print_exception(type(e), e, e.__traceback__)
+
+    async def close_journal(self, plan: AlertPlan):
+        if plan.run_id is None:
+            return
+        run_id, plan.run_id = plan.run_id, None
+        try:
+            await self.bot.journal.close_run(run_id) # type: ignore
+        except Exception as e:
+            traceback.print_exception(type(e), e, e.__traceback__)
 
-    async def generate_alert(self, alert_type: str):
+    async def resume_runs(self):
+        # Only runs interrupted by a restart; after a cog reload the journal's open runs are still being sent.
+        if self.bot.journal.resumed: # type: ignore
+            return
+        self.bot.journal.resumed = True # type: ignore
+        await self.bot.wait_until_ready()
+        time_now = discord.utils.utcnow()
+        for run_id, alert_type, fire_time, pending in await self.bot.journal.unfinished_runs(): # type: ignore
+            age = (time_now - fire_time).total_seconds()
+            if not pending or age < 0 or age > RESUME_WINDOWS.get(alert_type, 0):
+                # Runs planned for the future are rebuilt when their job fires.
+                await self.bot.journal.close_run(run_id) # type: ignore
+                continue
+            print(f"[{alert_type.upper()}] Resuming run {run_id} for {len(pending)} pending channels.")
+            await self.generate_alert(alert_type, resume=(run_id, fire_time, pending))
+
+    async def build_plan(self, alert_type: str, fire_time: datetime.datetime, lunar_due: Optional[List[int]] = None, only_channels: Optional[Set[int]] = None) -> AlertPlan:
+        plan = AlertPlan(alert_type, fire_time)
+        plan.lunar_due = lunar_due or []
+        recipients = self.bot.subscriptions.recipients(alert_type, fire_time, plan.lunar_due, self.bot.lunar_schedule.channel_guilds) # type: ignore
+        if len(recipients) == 0:
+            return plan
+        # Asian server cargo alerts share the cargo custom message.
+        premium_type = 'cargo' if alert_type == 'asian_server_cargo' else alert_type
+        async with self.bot.engine.begin() as conn: # type: ignore
+            premium_messages = await conn.execute(select(PremiumMessage.guild_id, PremiumMessage.message).filter_by(alert_type=premium_type))
+            premium_messages = {guild_id: message for guild_id, message in premium_messages.all()}
+        delete_delays = {'cargo': 10800, 'asian_server_cargo': 10800, 'crate': 14400, 'purification': 28800, 'controller': 28800, 'sproutlet': 15600, 'medics': 28800, 'lunar': 2690}
+        # Embeds only differ by language and premium template, so each one is built once and shared by every recipient.
+        rendered: Dict[Tuple[str, str, Optional[str], int], discord.Embed] = {}
+        fire_timestamp = int(fire_time.timestamp())
+        # Settings the cache has evicted are loaded for the whole plan at once rather than one guild at a time.
+        settings = await self.bot.guild_settings.get_many({guild_id for channel_id, guild_id in zip(recipients.channel_ids, recipients.guild_ids) if only_channels is None or channel_id in only_channels}) # type: ignore
+        for channel_id, guild_id, role_id, auto_delete in recipients.recipients():
+            if only_channels is not None and channel_id not in only_channels:
+                continue
+            plan.found.add(channel_id)
+            cur_chan = self.bot.get_channel(channel_id)
+            if cur_chan is None:
+                self.unresolved(plan, channel_id, guild_id)
+                continue
+            if not isinstance(cur_chan, discord.TextChannel):
+                continue
+            # Broken channels are purged and their guilds warned by the health index, not by the alert run.
+            if not self.bot.channel_health.healthy(alert_type, cur_chan): # type: ignore
+                plan.unhealthy += 1
+                continue
+            role_to_mention = cur_chan.guild.get_role(role_id) if role_id is not None else None
+            dest = self.bot.guild_settings.language(settings[guild_id], cur_chan.guild) # type: ignore
+            is_premium = self.bot.premium.is_premium(cur_chan.guild.id) # type: ignore
+            prem_msg = premium_messages.get(cur_chan.guild.id) if is_premium else None
+            render_key = (alert_type, dest, prem_msg, fire_timestamp)
+            reset_embed = rendered.get(render_key)
+            if reset_embed is None:
+                # Premium guilds without a custom message get the same embed as everyone else.
+                reset_embed = rendered[render_key] = self.render_alert(alert_type, fire_time, dest, prem_msg is not None, prem_msg)
+            plan.entries.append(PlannedAlert(
+                channel_id,
+                cur_chan,
+                is_premium,
+                f"{role_to_mention.mention if role_to_mention is not None else ''}",
+                reset_embed,
+                float(delete_delays[alert_type]) if auto_delete else None,
+                ))
+        plan.entries = self.dispatcher.ordering.order(plan.entries, self.dispatcher.ordering.offset(alert_type))
+        return plan
+
+    def unresolved(self, plan: AlertPlan, channel_id: int, guild_id: int):
+        guild = self.bot.get_guild(guild_id)
+        if self.bot.shard_gate.is_ready(shard_for(guild_id, self.bot.shard_count or 1)) and (guild is None or not guild.unavailable): # type: ignore
+            plan.missing.append(channel_id)
+        else:
+            # Not loaded yet, so there is no telling whether the channel still exists.
+            plan.deferred[channel_id] = guild_id
+
+    async def dispatch_deferred(self, plan: AlertPlan) -> List[Tuple[PlannedAlert, Any]]:
+        deferred, plan.deferred = plan.deferred, {}
+        shard_count = self.bot.shard_count or 1
+        timeout = SHARD_READY_DEADLINE - (discord.utils.utcnow() - plan.fire_time).total_seconds()
+        await self.bot.shard_gate.wait([shard_for(guild_id, shard_count) for guild_id in deferred.values()], timeout) # type: ignore
+        late = await self.build_plan(plan.alert_type, plan.fire_time, lunar_due=plan.lunar_due, only_channels=set(deferred))
+        plan.missing.extend(late.missing)
+        plan.deferred = late.deferred
+        plan.unhealthy += late.unhealthy
+        if not late.entries:
+            return []
+        print(f"[{plan.alert_type.upper()}] Sending to {len(late.entries)} channels from shards that were still loading.")
+        results = await self.dispatcher.fan_out_by_shard(late.entries, shard_count, lambda entry: self.deliver_alert(plan, entry), plan.metrics)
+        return list(zip(late.entries, results))
+
+    async def settle_tombstones(self, plan: AlertPlan):
+        table = subscription_table(plan.alert_type)
+        try:
+            await self.bot.tombstones.clear(table, plan.found - set(plan.missing) - set(plan.deferred)) # type: ignore
+            finalized = await self.bot.tombstones.miss(table, plan.missing) # type: ignore
+            await self.bot.tombstones.clear(table, finalized) # type: ignore
+        except Exception as e:
+            # A missed count only delays the purge until a later run.
+            traceback.print_exception(type(e), e, e.__traceback__)
+            return
+        plan.purged.extend((channel_id, f"Channel not found in {TOMBSTONE_MISSES} runs in a row.") for channel_id in finalized)
+
+    async def generate_alert(self, alert_type: str, resume: Optional[Tuple[int, datetime.datetime, Set[int]]] = None):
         start = perf_counter()
         errors = 0
         guilds_sent = 0
+        lunar_due = []
+        plan = None
         try:
-            sku_list = list()
-            skus = await self.bot.fetch_skus()
-            for sku in skus:
-                if sku.id == 1372073760546488391:
-                    sku_list.append(sku)
-            ent_list = [ent.guild_id async for ent in self.bot.entitlements(skus=sku_list,exclude_ended=True)]
-            
             time_now = discord.utils.utcnow()
-            if alert_type != "lunar":
+            if resume is not None:
+                run_id, fire_time, pending = resume
+                plan = await self.build_plan(alert_type, fire_time, only_channels=pending)
+                plan.run_id = run_id
+            elif alert_type != "lunar":
                 print(f"[{alert_type.upper()}] Timer start: {time_now}")
-            async with self.bot.engine.begin() as conn: # type: ignore
-                if alert_type == 'cargo':
-                    qry_filter = {11: CargoMutes.twelve==False, 14: CargoMutes.fifteen==False, 18: CargoMutes.eighteen_thirty==False, 21: CargoMutes.twenty_two==False}
-                    all_channels = await conn.execute(select(CargoScrambleChannel.channel_id, CargoScrambleChannel.role_id, AutoDelete.cargo).where(CargoScrambleChannel.asian_server == False).join(AutoDelete, AutoDelete.guild_id == CargoScrambleChannel.guild_id).join(CargoMutes).filter(qry_filter.get(time_now.hour))) # type: ignore
-                elif alert_type == 'asian_server_cargo':
-                    qry_filter = {11: CargoMutes.twelve==False, 14: CargoMutes.fifteen==False, 18: CargoMutes.eighteen_thirty==False, 21: CargoMutes.twenty_two==False}
-                    all_channels = await conn.execute(select(CargoScrambleChannel.channel_id, CargoScrambleChannel.role_id, AutoDelete.cargo).where(CargoScrambleChannel.asian_server == True).join(AutoDelete, AutoDelete.guild_id == CargoScrambleChannel.guild_id).join(CargoMutes).filter(qry_filter.get(time_now.hour))) # type: ignore
-                elif alert_type == 'crate':
-                    qry_filter = {0: CrateMutes.zero==False, 4: CrateMutes.four==False, 8: CrateMutes.eight==False, 12: CrateMutes.twelve==False, 16: CrateMutes.sixteen==False, 20: CrateMutes.twenty==False}
-                    all_channels = await conn.execute(select(CrateRespawnChannel.channel_id, CrateRespawnChannel.role_id, AutoDelete.crate).join(AutoDelete, AutoDelete.guild_id == CrateRespawnChannel.guild_id).join(CrateMutes).filter(qry_filter.get(time_now.hour))) # type: ignore
-                elif alert_type == 'purification':
-                    day_num = discord.utils.utcnow().isoweekday()
-                    all_channels = await conn.execute(select(Purification.channel_id, Purification.role_id, Purification.auto_delete).filter(Purification.reset_day==day_num))
-                elif alert_type == 'controller':
-                    day_num = discord.utils.utcnow().isoweekday()
-                    all_channels = await conn.execute(select(Controller.channel_id, Controller.role_id, Controller.auto_delete).filter(Controller.reset_day==day_num))
-                elif alert_type == 'sproutlet':
-                    all_channels = await conn.execute(select(Sproutlet.channel_id, Sproutlet.role_id, Sproutlet.auto_delete).filter(Sproutlet.hour==time_now.hour))
-                elif alert_type == 'medics':
-                    all_channels = await conn.execute(select(Medics.channel_id, Medics.role_id, Medics.auto_delete))
-                elif alert_type == 'lunar':
-                    all_channels = await conn.execute(select(Lunar.channel_id, Lunar.role_id, Lunar.auto_delete).filter((Lunar.last_alert+LUNAR_EVENT_LENGTH)<=int(time_now.timestamp())))
-                all_channels = all_channels.all()
-                if len(all_channels) == 0:
-                    return #await self.send_log('info', alert_type, f"Sent to 0 guilds.\nBot currently in {len(self.bot.guilds):,} guilds.", silent=True)
-            random.shuffle(all_channels)
-            for channel_id, role_id, auto_delete in all_channels:
-                swapped_alert = False
-                role_to_mention = None
-                perm_errors = []
-                cur_chan = self.bot.get_channel(channel_id)
-                if cur_chan is None:
-                    await self.purge_channel(alert_type=alert_type, channel_id=channel_id)
+                async with self.plan_lock(alert_type):
+                    self.fired[alert_type] = time_now
+                    plan = self.plans.pop(alert_type, None)
+                    if plan is None or abs((plan.fire_time - time_now).total_seconds()) > PLAN_TOLERANCE:
+                        if plan is not None:
+                            await self.close_journal(plan)
+                        plan = await self.build_plan(alert_type, time_now)
+                        await self.open_journal(plan)
+            else:
+                lunar_due = self.bot.lunar_schedule.pop_due(int(time_now.timestamp())) # type: ignore
+                if len(lunar_due) == 0:
+                    return
+                plan = await self.build_plan(alert_type, time_now, lunar_due)
+            if len(plan.found) == 0:
+                if alert_type == 'lunar':
+                    for channel_id in lunar_due:
+                        self.bot.lunar_schedule.remove(channel_id) # type: ignore
+                await self.close_journal(plan)
+                return #await self.send_log('info', alert_type, f"Sent to 0 guilds.\nBot currently in {len(self.bot.guilds):,} guilds.", silent=True)
+            plan.metrics = self.metrics.start_run(alert_type, plan.fire_time)
+            self.dispatcher.ordering.record(alert_type, plan.entries)
+            if resume is None:
+                self.dispatcher.ordering.advance(alert_type)
+            # Guild warnings queued during the run are sent once the fan-out is over.
+            self.bot.notifier.hold() # type: ignore
+            try:
+                results = await self.dispatcher.fan_out_by_shard(plan.entries, self.bot.shard_count or 1, lambda entry: self.deliver_alert(plan, entry), plan.metrics)
+                outcomes = list(zip(plan.entries, results))
+                # Lunar alerts are retried on the next tick instead of holding up the job.
+                if plan.deferred and alert_type != 'lunar':
+                    outcomes += await self.dispatch_deferred(plan)
+            finally:
+                self.bot.notifier.release() # type: ignore
+            delivered = []
+            for entry, result in outcomes:
+                if result is True:
+                    guilds_sent += 1
+                    delivered.append(entry.channel_id)
+                elif result is False:
                     errors += 1
-                    continue
-                if isinstance(cur_chan, discord.TextChannel):
-                    if not cur_chan.permissions_for(cur_chan.guild.me).send_messages:
-                        perm_errors.append('Send Messages')
-                    if not cur_chan.permissions_for(cur_chan.guild.me).view_channel:
-                        perm_errors.append('View Channel')
-                    if not cur_chan.permissions_for(cur_chan.guild.me).embed_links:
-                        perm_errors.append('Embed Links')
-                    if len(perm_errors) > 0:
-                        errors += 1
-                        await self.purge_channel(alert_type=alert_type, channel_id=channel_id)
-                        if cur_chan.guild.system_channel:
-                            try:
-                                await cur_chan.guild.system_channel.send(f"Your {alert_type} channel was deleted from the bot due to missing `{', '.join(perm_errors)}` permission.  Please re-add it with the appropriate setup command.")
-                                sent_error = True
-                            except:
-                                sent_error = False
-                        await self.send_log('error', alert_type, f"Deleted {cur_chan.name} (channel_id: {channel_id}) @ {discord.utils.escape_markdown(cur_chan.guild.name)} (guild_id: {cur_chan.guild.id}) due to missing `{', '.join(perm_errors)}` permission.\n{'Sent error message.' if sent_error else 'Did not send error message.'}")
-                        continue
-                    if role_id is not None:
-                        role_to_mention = cur_chan.guild.get_role(role_id)
-                    try:
-                        dest = await self.get_language(cur_chan.guild)
-                        if cur_chan.guild.id in ent_list:
-                            is_premium = True
-                        else:
-                            is_premium = False
-                        embed_titles = {
-                            'cargo': TRANSLATIONS[dest]['cargo_embed_title'],
-                            'asian_server_cargo': TRANSLATIONS[dest]['cargo_embed_title'],
-                            'crate': TRANSLATIONS[dest]['crate_embed_title'],
-                            'purification': TRANSLATIONS[dest]['purification_embed_title'],
-                            'controller': TRANSLATIONS[dest]['controller_embed_title'],
-                            'sproutlet': TRANSLATIONS[dest]['sproutlet_embed_title'],
-                            'medics': TRANSLATIONS[dest]['medics_embed_title'],
-                            'lunar': TRANSLATIONS[dest]['lunar_embed_title'],
-                            }
-                        reset_embed = discord.Embed(color=discord.Color.blurple())
-                        reset_embed.title = embed_titles.get(alert_type, "OnceHumanUtilityBot Alert")
-                        # reset_embed.description="Custom messages are now supported, for more info check out the [📢 Bot Updates](https://discord.com/channels/1264596246644002898/1267474310948327526/1372099827529285672)!\n- Bot Support Server Link: https://discord.mycodeisa.meme"
-                        if not is_premium:
-                            if alert_type == 'cargo':
-                                cargo_timestamp = int(datetime.datetime.timestamp(time_now + datetime.timedelta(minutes=5)))
-                                reset_embed.add_field(name='', value=TRANSLATIONS[dest]['cargo_scramble_alert_message'].format(f'<t:{cargo_timestamp}:R>'), inline=False)
-                            elif alert_type == 'asian_server_cargo':
-                                cargo_timestamp = int(datetime.datetime.timestamp(time_now + datetime.timedelta(minutes=5)))
-                                reset_embed.add_field(name='', value=TRANSLATIONS[dest]['asian_cargo_scramble_alert_message'].format(f'<t:{cargo_timestamp}:R>'), inline=False)
-                            elif alert_type == 'crate':
-                                crate_timestamp = int(datetime.datetime.timestamp(time_now.replace(minute=0, second=0, microsecond=0)))
-                                reset_embed.add_field(name='', value=TRANSLATIONS[dest]['crate_respawn_alert_message'].format(f'<t:{crate_timestamp}:t>'), inline=False)
-                                reset_embed.set_footer(text=TRANSLATIONS[dest]['crate_respawn_footer'])
-                            elif alert_type == 'purification':
-                                reset_embed.add_field(name='', value=TRANSLATIONS[dest]['purification_reset_alert_message'], inline=False)
-                            elif alert_type == 'controller':
-                                reset_embed.add_field(name='', value=TRANSLATIONS[dest]['controller_reset_alert_message'], inline=False)
-                            elif alert_type == 'sproutlet':
-                                reset_embed.add_field(name='', value=TRANSLATIONS[dest]['sproutlet_alert_message'], inline=False)
-                            elif alert_type == 'medics':
-                                medics_timestamp = int(datetime.datetime.timestamp(time_now.replace(minute=0, second=0, microsecond=0)))
-                                reset_embed.add_field(name='', value=TRANSLATIONS[dest]['medics_respawn_alert_message'].format(f'<t:{medics_timestamp}:t>'), inline=False)
-                                reset_embed.set_footer(text=TRANSLATIONS[dest]['medics_respawn_footer'])
-                            elif alert_type == 'lunar':
-                                reset_embed.add_field(name='', value=TRANSLATIONS[dest]['lunar_alert_message'], inline=False)
-                        else:
-                            use_default = False
-                            async with self.bot.engine.begin() as conn: # type: ignore
-                                if alert_type == 'asian_server_cargo':
-                                    alert_type = 'cargo'
-                                    swapped_alert = True
-                                premium_message = await conn.execute(select(PremiumMessage.message).filter_by(guild_id=cur_chan.guild.id,alert_type=alert_type))
-                                premium_message = premium_message.all()
-                                if len(premium_message) > 0:
-                                    prem_msg: str = premium_message[0][0]
-                                    #await self.send_log('info', alert_type, message=f"{premium_message} / type: {type(premium_message)}")
-                                else:
-                                    use_default = True
-                            if swapped_alert:
-                                alert_type = 'asian_server_cargo'
-                            generic_timestamp = int(datetime.datetime.timestamp(time_now))
-                            if alert_type == 'cargo':
-                                cargo_timestamp = int(datetime.datetime.timestamp(time_now + datetime.timedelta(minutes=5)))
-                                reset_embed.add_field(name='', value=prem_msg.replace("%time%", f'<t:{cargo_timestamp}:R>'), inline=False)
-                                if use_default:
-                                    reset_embed.add_field(name='', value=TRANSLATIONS[dest]['cargo_scramble_alert_message'].format(f'<t:{cargo_timestamp}:R>'), inline=False)
-                            elif alert_type == 'asian_server_cargo':
-                                cargo_timestamp = int(datetime.datetime.timestamp(time_now + datetime.timedelta(minutes=5)))
-                                reset_embed.add_field(name='', value=prem_msg.replace("%time%", f'<t:{cargo_timestamp}:R>'), inline=False)                                
-                                if use_default:
-                                    reset_embed.add_field(name='', value=TRANSLATIONS[dest]['asian_cargo_scramble_alert_message'].format(f'<t:{cargo_timestamp}:R>'), inline=False)
-                            elif alert_type == 'crate':
-                                crate_timestamp = int(datetime.datetime.timestamp(time_now.replace(minute=0, second=0, microsecond=0)))
-                                reset_embed.add_field(name='', value=prem_msg.replace("%time%", f'<t:{crate_timestamp}:R>'), inline=False)
-                                if use_default:
-                                    reset_embed.add_field(name='', value=TRANSLATIONS[dest]['crate_respawn_alert_message'].format(f'<t:{crate_timestamp}:t>'), inline=False)
-                                reset_embed.set_footer(text=TRANSLATIONS[dest]['crate_respawn_footer'])
-                            elif alert_type == 'purification':
-                                reset_embed.add_field(name='', value=prem_msg.replace("%time%", f'<t:{generic_timestamp}:R>'), inline=False)
-                                if use_default:
-                                    reset_embed.add_field(name='', value=TRANSLATIONS[dest]['purification_reset_alert_message'], inline=False)
-                            elif alert_type == 'controller':
-                                reset_embed.add_field(name='', value=prem_msg.replace("%time%", f'<t:{generic_timestamp}:R>'), inline=False)
-                                if use_default:
-                                    reset_embed.add_field(name='', value=TRANSLATIONS[dest]['controller_reset_alert_message'], inline=False)
-                            elif alert_type == 'sproutlet':
-                                reset_embed.add_field(name='', value=prem_msg.replace("%time%", f'<t:{generic_timestamp}:R>'), inline=False)
-                                if use_default:
-                                    reset_embed.add_field(name='', value=TRANSLATIONS[dest]['sproutlet_alert_message'], inline=False)
-                            elif alert_type == 'medics':
-                                medics_timestamp = int(datetime.datetime.timestamp(time_now.replace(minute=0, second=0, microsecond=0)))
-                                reset_embed.add_field(name='', value=prem_msg.replace("%time%", f'<t:{medics_timestamp}:R>'), inline=False)
-                                if use_default:
-                                    reset_embed.add_field(name='', value=TRANSLATIONS[dest]['medics_respawn_alert_message'].format(f'<t:{medics_timestamp}:t>'), inline=False)
-                                reset_embed.set_footer(text=TRANSLATIONS[dest]['medics_respawn_footer'])
-                            elif alert_type == 'lunar':
-                                reset_embed.add_field(name='', value=prem_msg.replace("%time%", f'<t:{generic_timestamp}:R>'), inline=False)
-                                if use_default:
-                                    reset_embed.add_field(name='', value=TRANSLATIONS[dest]['lunar_alert_message'], inline=False)
-
-                        if auto_delete:
-                            delete_delays = {'cargo': 10800, 'asian_server_cargo': 10800, 'crate': 14400, 'purification': 28800, 'controller': 28800, 'sproutlet': 15600, 'medics': 28800, 'lunar': 2690}
-                            await cur_chan.send(content=f"{role_to_mention.mention if role_to_mention is not None else ''}", embed=reset_embed, delete_after=float(delete_delays.get(alert_type))) # type: ignore
-                            guilds_sent += 1
-                        else:
-                            await cur_chan.send(content=f"{role_to_mention.mention if role_to_mention is not None else ''}", embed=reset_embed)
-                            guilds_sent += 1
-                        async with self.bot.engine.begin() as conn: # type: ignore
-                            update_stmt = update(Lunar).where(Lunar.channel_id==channel_id).values(last_alert=int(time_now.timestamp()))
-                            await conn.execute(update_stmt)
-                    except Exception as e:
-                        traceback.print_exception(type(e), e, e.__traceback__)
-                        errors += 1
-                        try:
-                            support_cmd: discord.app_commands.AppCommand = await self.find_cmd(self.bot, 'support') # type: ignore
-                            feedback_cmd: discord.app_commands.AppCommand = await self.find_cmd(self.bot, 'feedback') # type: ignore
-                            if '503 Service Unavailable' in str(e.__traceback__):
-                                e = "An error with Discord's servers."
-                            if support_cmd and feedback_cmd and cur_chan.guild.system_channel:
-                                await cur_chan.guild.system_channel.send(f"Your {alert_type.replace('_', ' ')} alert was not sent due to `{e}`.\nIf this happens multiple times, please contact me on the support server ({support_cmd.mention}) or send a bug report ({feedback_cmd.mention}).")
-                                sent_error = True
-                        except:
-                            sent_error = False
-                        await self.send_log('error', alert_type, f"Error with {cur_chan.name} (channel_id: {channel_id}) @ {discord.utils.escape_markdown(cur_chan.guild.name)} (guild_id: {cur_chan.guild.id}) due to:\n{e}\n\n{'Sent error message.' if sent_error else 'Did not send error.'}")
-                        continue
+                elif isinstance(result, BaseException):
+                    errors += 1
+                    traceback.print_exception(type(result), result, result.__traceback__)
+            self.dispatcher.prune_buckets()
+            await self.close_journal(plan)
+            await self.settle_tombstones(plan)
+            errors += len(plan.missing) + len(plan.deferred) + plan.unhealthy
+            if plan.deferred:
+                print(f"[{alert_type.upper()}] {len(plan.deferred)} channels were skipped because their shards did not finish loading in time.")
+            if plan.purged:
+                await self.purge_channels(alert_type, plan.purged)
+            if alert_type == 'lunar':
+                await self.reschedule_lunar(plan, delivered, int(time_now.timestamp()))
+                lunar_due = []
             end = perf_counter()
             elapsed = end - start
             if elapsed >= 3600:
@@ -351,17 +411,148 @@ class TimerCog(commands.Cog):
                 elapsed = f"{(end - start)/60:.2f} minutes"
             else:
                 elapsed = f"{(end - start):.2f} seconds"
+            plan.metrics.errors = errors
+            self.metrics.finish_run(plan.metrics)
             if guilds_sent >= 5 and alert_type != "lunar":
-                await self.send_log('info', alert_type, f"Sent to {guilds_sent} guilds.  Errors: {errors}\nBot currently in {len(self.bot.guilds):,} guilds.\nTime taken: {elapsed}")
+                await self.send_log('info', alert_type, f"Sent to {guilds_sent} guilds.  Errors: {errors}\nBot currently in {len(self.bot.guilds):,} guilds.\nTime taken: {elapsed}\nLatency: {format_summary(plan.metrics.summary())}\n429s: `{plan.metrics.rate_limited}`\n{plan.metrics.shard_report()}")
         except Exception as e:
             errors += 1
+            if plan is not None:
+                await self.close_journal(plan)
+            if lunar_due:
+                # Retry on the next tick rather than losing the timers until a restart.
+                self.bot.lunar_schedule.reschedule(lunar_due, int(time_now.timestamp())) # type: ignore
             err = e
             traceback_str = ''.join(traceback.format_tb(e.__traceback__))
             traceback.print_exception(type(e), e, e.__traceback__)
-            await self.send_log('error', alert_type, f"{traceback_str[-2000:]}")
+            await self.send_log('error', alert_type, f"{traceback_str[-2000:]}", error=e)
         else:
             pass
 
+    def render_alert(self, alert_type: str, time_now: datetime.datetime, dest: str, is_premium: bool, prem_msg: Optional[str]) -> discord.Embed:
+        reset_embed = discord.Embed(color=discord.Color.blurple())
+        reset_embed.title = TRANSLATIONS[dest][EMBED_TITLE_KEYS[alert_type]] if alert_type in EMBED_TITLE_KEYS else "OnceHumanUtilityBot Alert"
+        # reset_embed.description="Custom messages are now supported, for more info check out the [📢 Bot Updates](https://discord.com/channels/1264596246644002898/1267474310948327526/1372099827529285672)!\n- Bot Support Server Link: https://discord.mycodeisa.meme"
+        if not is_premium:
+            if alert_type == 'cargo':
+                cargo_timestamp = int(datetime.datetime.timestamp(time_now + datetime.timedelta(minutes=5)))
+                reset_embed.add_field(name='', value=TRANSLATIONS[dest]['cargo_scramble_alert_message'].format(f'<t:{cargo_timestamp}:R>'), inline=False)
+            elif alert_type == 'asian_server_cargo':
+                cargo_timestamp = int(datetime.datetime.timestamp(time_now + datetime.timedelta(minutes=5)))
+                reset_embed.add_field(name='', value=TRANSLATIONS[dest]['asian_cargo_scramble_alert_message'].format(f'<t:{cargo_timestamp}:R>'), inline=False)
+            elif alert_type == 'crate':
+                crate_timestamp = int(datetime.datetime.timestamp(time_now.replace(minute=0, second=0, microsecond=0)))
+                reset_embed.add_field(name='', value=TRANSLATIONS[dest]['crate_respawn_alert_message'].format(f'<t:{crate_timestamp}:t>'), inline=False)
+                reset_embed.set_footer(text=TRANSLATIONS[dest]['crate_respawn_footer'])
+            elif alert_type == 'purification':
+                reset_embed.add_field(name='', value=TRANSLATIONS[dest]['purification_reset_alert_message'], inline=False)
+            elif alert_type == 'controller':
+                reset_embed.add_field(name='', value=TRANSLATIONS[dest]['controller_reset_alert_message'], inline=False)
+            elif alert_type == 'sproutlet':
+                reset_embed.add_field(name='', value=TRANSLATIONS[dest]['sproutlet_alert_message'], inline=False)
+            elif alert_type == 'medics':
+                medics_timestamp = int(datetime.datetime.timestamp(time_now.replace(minute=0, second=0, microsecond=0)))
+                reset_embed.add_field(name='', value=TRANSLATIONS[dest]['medics_respawn_alert_message'].format(f'<t:{medics_timestamp}:t>'), inline=False)
+                reset_embed.set_footer(text=TRANSLATIONS[dest]['medics_respawn_footer'])
+            elif alert_type == 'lunar':
+                reset_embed.add_field(name='', value=TRANSLATIONS[dest]['lunar_alert_message'], inline=False)
+        else:
+            use_default = prem_msg is None
+            generic_timestamp = int(datetime.datetime.timestamp(time_now))
+            if alert_type == 'cargo':
+                cargo_timestamp = int(datetime.datetime.timestamp(time_now + datetime.timedelta(minutes=5)))
+                if use_default:
+                    reset_embed.add_field(name='', value=TRANSLATIONS[dest]['cargo_scramble_alert_message'].format(f'<t:{cargo_timestamp}:R>'), inline=False)
+                else:
+                    reset_embed.add_field(name='', value=prem_msg.replace("%time%", f'<t:{cargo_timestamp}:R>'), inline=False)
+            elif alert_type == 'asian_server_cargo':
+                cargo_timestamp = int(datetime.datetime.timestamp(time_now + datetime.timedelta(minutes=5)))
+                if use_default:
+                    reset_embed.add_field(name='', value=TRANSLATIONS[dest]['asian_cargo_scramble_alert_message'].format(f'<t:{cargo_timestamp}:R>'), inline=False)
+                else:
+                    reset_embed.add_field(name='', value=prem_msg.replace("%time%", f'<t:{cargo_timestamp}:R>'), inline=False)
+            elif alert_type == 'crate':
+                crate_timestamp = int(datetime.datetime.timestamp(time_now.replace(minute=0, second=0, microsecond=0)))
+                if use_default:
+                    reset_embed.add_field(name='', value=TRANSLATIONS[dest]['crate_respawn_alert_message'].format(f'<t:{crate_timestamp}:t>'), inline=False)
+                else:
+                    reset_embed.add_field(name='', value=prem_msg.replace("%time%", f'<t:{crate_timestamp}:R>'), inline=False)
+                reset_embed.set_footer(text=TRANSLATIONS[dest]['crate_respawn_footer'])
+            elif alert_type == 'purification':
+                if use_default:
+                    reset_embed.add_field(name='', value=TRANSLATIONS[dest]['purification_reset_alert_message'], inline=False)
+                else:
+                    reset_embed.add_field(name='', value=prem_msg.replace("%time%", f'<t:{generic_timestamp}:R>'), inline=False)
+            elif alert_type == 'controller':
+                if use_default:
+                    reset_embed.add_field(name='', value=TRANSLATIONS[dest]['controller_reset_alert_message'], inline=False)
+                else:
+                    reset_embed.add_field(name='', value=prem_msg.replace("%time%", f'<t:{generic_timestamp}:R>'), inline=False)
+            elif alert_type == 'sproutlet':
+                if use_default:
+                    reset_embed.add_field(name='', value=TRANSLATIONS[dest]['sproutlet_alert_message'], inline=False)
+                else:
+                    reset_embed.add_field(name='', value=prem_msg.replace("%time%", f'<t:{generic_timestamp}:R>'), inline=False)
+            elif alert_type == 'medics':
+                medics_timestamp = int(datetime.datetime.timestamp(time_now.replace(minute=0, second=0, microsecond=0)))
+                if use_default:
+                    reset_embed.add_field(name='', value=TRANSLATIONS[dest]['medics_respawn_alert_message'].format(f'<t:{medics_timestamp}:t>'), inline=False)
+                else:
+                    reset_embed.add_field(name='', value=prem_msg.replace("%time%", f'<t:{medics_timestamp}:R>'), inline=False)
+                reset_embed.set_footer(text=TRANSLATIONS[dest]['medics_respawn_footer'])
+            elif alert_type == 'lunar':
+                if use_default:
+                    reset_embed.add_field(name='', value=TRANSLATIONS[dest]['lunar_alert_message'], inline=False)
+                else:
+                    reset_embed.add_field(name='', value=prem_msg.replace("%time%", f'<t:{generic_timestamp}:R>'), inline=False)
+        return reset_embed
+
+    async def deliver_webhook(self, plan: AlertPlan, entry: PlannedAlert, webhook: discord.Webhook) -> bool:
+        try:
+            username, avatar_url = self.bot.webhooks.identity(entry.guild_id) # type: ignore
+            msg = await self.dispatcher.send(entry.channel_id, lambda: webhook.send(content=entry.content, embed=entry.embed, username=username, avatar_url=avatar_url, wait=entry.delete_after is not None), plan.metrics)
+        except discord.NotFound:
+            # The webhook was deleted in Discord, so drop it and use a normal send from now on.
+            await self.bot.webhooks.discard([entry.channel_id]) # type: ignore
+            return False
+        if msg is not None and entry.delete_after is not None:
+            self.bot.deletions.schedule(entry.channel_id, msg.id, entry.delete_after, via_webhook=True) # type: ignore
+        return True
+
+    async def deliver_alert(self, plan: AlertPlan, entry: PlannedAlert) -> Optional[bool]:
+        alert_type = plan.alert_type
+        channel_id = entry.channel_id
+        # Cheap revalidation of the plan: the channel may have gone or broken since it was built.
+        cur_chan = self.bot.get_channel(channel_id)
+        if cur_chan is None:
+            # Counted with the rest of plan.missing and plan.deferred, not as a failed send.
+            self.unresolved(plan, channel_id, entry.guild_id)
+            return None
+        if not self.bot.channel_health.healthy(alert_type, cur_chan): # type: ignore
+            return False
+        try:
+            webhook = self.bot.webhooks.get(channel_id) # type: ignore
+            sent = False
+            if webhook is not None:
+                sent = await self.deliver_webhook(plan, entry, webhook)
+            if not sent:
+                msg = await self.dispatcher.send(channel_id, lambda: cur_chan.send(content=entry.content, embed=entry.embed), plan.metrics) # type: ignore
+                if entry.delete_after is not None:
+                    self.bot.deletions.schedule(channel_id, msg.id, entry.delete_after) # type: ignore
+            if plan.metrics is not None:
+                plan.metrics.record(cur_chan.guild.shard_id) # type: ignore
+            if plan.run_id is not None:
+                self.bot.journal.mark_delivered(plan.run_id, channel_id) # type: ignore
+            return True
+        except Exception as e:
+            traceback.print_exception(type(e), e, e.__traceback__)
+            error = e
+            if '503 Service Unavailable' in str(e.__traceback__):
+                e = "An error with Discord's servers."
+            queued = self.bot.notifier.notify(cur_chan.guild, f"Your {alert_type.replace('_', ' ')} alert was not sent due to `{e}`.") # type: ignore
+            await self.send_log('error', alert_type, f"Error with {cur_chan.name} (channel_id: {channel_id}) @ {discord.utils.escape_markdown(cur_chan.guild.name)} (guild_id: {cur_chan.guild.id}) due to:\n{e}\n\n{'Queued error message.' if queued else 'Did not send error.'}", error=error)
+            return False
+
 
     @app_commands.command(name='check_timers', description='Returns all running timer jobs.')
     @app_commands.guild_only()
@@ -375,13 +566,31 @@ class TimerCog(commands.Cog):
         await interaction.response.send_message(f"## Running jobs = {len(jobs)}\n{jobs_info}", delete_after=120, ephemeral=True)
 
 
+    @app_commands.command(name='alert_latency', description='Returns alert delivery latency from scheduled time to send.')
+    @app_commands.guild_only()
+    @app_commands.check(me_only)
+    @app_commands.guilds(MY_GUILD_ID)
+    async def alert_latency(self, interaction: discord.Interaction):
+        latency_embed = discord.Embed(title="Alert Delivery Latency", color=discord.Color.blue())
+        latency_embed.description = self.metrics.report()[:4096]
+        for run, summary in list(self.metrics.runs)[-5:]:
+            run_info = f"{format_summary(summary)}\n429s: `{run.rate_limited}` Errors: `{run.errors}`"
+            slowest = run.slowest_shard()
+            if slowest is not None:
+                run_info += f"\nSlowest {slowest}"
+            latency_embed.add_field(name=f"{run.alert_type} @ <t:{int(run.fire_time.timestamp())}:t>", value=run_info, inline=False)
+        latency_embed.add_field(name="Delivery order", value=self.dispatcher.ordering.report()[:1024], inline=False)
+        latency_embed.add_field(name="Database pool", value=self.bot.db.pool_report(), inline=False) # type: ignore
+        await interaction.response.send_message(embed=latency_embed, delete_after=120, ephemeral=True)
+
+
     @app_commands.command(name='next', description='Returns the current UTC time and the next cargo/crate respawn timer.')
     @app_commands.checks.cooldown(1, 30, key=lambda i: (i.guild_id, i.user.id))
     @app_commands.guild_only()
     async def next_crate_and_cargo_time(self, interaction: discord.Interaction):
         if interaction.guild:
             await interaction.response.defer(ephemeral=True)
-            dest = await self.get_language(interaction.guild)
+            dest = await self.bot.guild_settings.get_language(interaction.guild)
             time_now = discord.utils.utcnow()
             crate_job = [job for job in self.scheduler.get_jobs() if job.name == "crate_respawn_alert"][0]
             cargo_job = [job for job in self.scheduler.get_jobs() if job.name == "cargo_spawn_alert"][0]
@@ -2,15 +2,15 @@ import datetime
 import random
 import unicodedata
 from time import perf_counter
-from typing import List, Literal, Optional
+from typing import List, Literal
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 from dotenv import dotenv_values
 from googletrans import Translator
-from sqlalchemy import delete, func, or_, select
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import BigInteger, any_, delete, func, literal, or_, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 
 from languages import LANGUAGES
 from models.channels import (Medics, CargoMutes, CargoScrambleChannel, CrateMutes,
@@ -53,42 +53,12 @@ class UtilsCog(commands.GroupCog, name='utils'):
         return days_to_num[day]
 
     async def send_log(self, type: str, alert_type: str, message: str, silent: bool = False):
-        log_channel: discord.TextChannel = self.bot.get_channel(int(config["LOG_CHAN"]))
-        log_embed = discord.Embed(description=message[:4096])
-        if type == 'error':
-            log_embed.color = discord.Color.red()
-            log_embed.title = f"Error"
-        elif type == 'warn':
-            log_embed.color = discord.Color.orange()
-            log_embed.title = f"Warning"
-        elif type == 'info':
-            log_embed.color = discord.Color.blue()
-            log_embed.title = f"Info"
-        log_embed.title += f" - {alert_type.upper()}"
-        msg = await log_channel.send(embed=log_embed, silent=silent)
-        return await msg.delete(delay=7200)
+        self.bot.log_sink.log(type, alert_type, message, silent=silent, delete_after=7200)
 
     def fix_unicode(self, str):
         fixed = unicodedata.normalize("NFKD", str).encode("ascii", "ignore").decode()
         return fixed
 
-    async def find_cmd(self, bot: commands.Bot, cmd: str, group: Optional[str] = None):
-        if group is None:
-            command = discord.utils.find(
-                lambda c: c.name.lower() == cmd.lower(),
-                await bot.tree.fetch_commands(),
-            )
-            return command
-        else:
-            cmd_group = discord.utils.find(
-                lambda cg: cg.name.lower() == group.lower(),
-                await bot.tree.fetch_commands(),
-            )
-            for child in cmd_group.options:
-                if child.name.lower() == cmd.lower():
-                    return child
-
-
     @app_commands.command(name='utility', description='UTILITY!')
     async def utility_cmd(self, interaction: discord.Interaction, filter: int):
         await interaction.response.defer()
@@ -96,13 +66,20 @@ class UtilsCog(commands.GroupCog, name='utils'):
             muted_guilds = await conn.execute(select(CrateMutes.guild_id))
             muted_guilds = muted_guilds.all()
             muted_guilds = [g_id[0] for g_id in muted_guilds]
+            added = []
             for guild in self.bot.guilds:
                 if guild.id not in muted_guilds:
                     crate_insert = insert(CrateMutes).values(guild_id=guild.id,zero=False,four=False,eight=False,twelve=False,sixteen=False,twenty=False)
                     crate_update = crate_insert.on_conflict_do_update(constraint='crate_mutes_unique_guildid', set_={'zero': False, 'four': False, 'eight': False, 'twelve': False, 'sixteen': False, 'twenty': False})
                     await conn.execute(crate_update)
+                    added.append(guild.id)
                     await interaction.followup.send(f"Added guild_id {guild.id}.")
-            await interaction.followup.send(f"Done.")
+            auto_deletes = await conn.execute(select(AutoDelete.guild_id, AutoDelete.crate).where(AutoDelete.guild_id == any_(literal(added, ARRAY(BigInteger)))))
+            auto_deletes = auto_deletes.all()
+        # Crate alerts skip guilds without both a crate_mutes and an auto_delete row, so these guilds may only now receive them.
+        for guild_id, auto_delete in auto_deletes:
+            self.bot.subscriptions.configure('crate', guild_id, auto_delete)
+        await interaction.followup.send(f"Done.")
 
         
 
@@ -272,7 +249,7 @@ class UtilsCog(commands.GroupCog, name='utils'):
                         if auto_delete:
                             delete_delays = {'cargo': 10800, 'crate': 14400, 'purification': 28800, 'controller': 28800, 'sproutlet': 15600, 'medics': 28800}
                             msg = await cur_chan.send(content=f"{role_to_mention.mention if role_to_mention is not None else ''}", embed=reset_embed)
-                            await msg.delete(delay=delete_delays.get(alert_type))
+                            self.bot.deletions.schedule(channel_id, msg.id, delete_delays.get(alert_type))
                         else:
                             await cur_chan.send(content=f"{role_to_mention.mention if role_to_mention is not None else ''}", embed=reset_embed)
                         guilds_sent += 1
@@ -5,11 +5,8 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from dotenv import dotenv_values
-from sqlalchemy import select
 from sqlalchemy.dialects.postgresql import insert
 
-from languages import LANGUAGES
-from models.languages import GuildLanguage
 from models.weekly_resets import Controller, Purification, Sproutlet
 from translations import TRANSLATIONS
 
@@ -21,32 +18,6 @@ class WeeklysCog(commands.GroupCog, name='weekly'):
     def __init__(self, bot):
         self.bot = bot
 
-    async def get_language(self, guild: discord.Guild) -> str:
-        async with self.bot.engine.begin() as conn:
-            lang = await conn.execute(select(GuildLanguage.lang).filter_by(guild_id=guild.id))
-            lang = lang.one_or_none()
-        if lang is not None:
-            lang = lang.lang
-        if lang is None:
-            lang = LANGUAGES.get(str(guild.preferred_locale).lower(), 'en')
-        return lang
-
-    async def find_cmd(self, bot: commands.Bot, cmd: str, group: Optional[str] = None):
-        if group is None:
-            command = discord.utils.find(
-                lambda c: c.name.lower() == cmd.lower(),
-                await bot.tree.fetch_commands(),
-            )
-            return command
-        else:
-            cmd_group = discord.utils.find(
-                lambda cg: cg.name.lower() == group.lower(),
-                await bot.tree.fetch_commands(),
-            )
-            for child in cmd_group.options:
-                if child.name.lower() == cmd.lower():
-                    return child
-                
     async def day_to_number(self, day: str) -> int:
         day = day.lower()
         days_to_num = {
@@ -75,12 +46,12 @@ class WeeklysCog(commands.GroupCog, name='weekly'):
             auto_delete = True
         elif auto_delete == "Off":
             auto_delete = False
-        dest = await self.get_language(interaction.guild)
+        dest = await self.bot.guild_settings.get_language(interaction.guild)
         if not output_channel.permissions_for(output_channel.guild.me).send_messages or not output_channel.permissions_for(output_channel.guild.me).view_channel or not output_channel.permissions_for(output_channel.guild.me).embed_links:
             return await interaction.followup.send(content=TRANSLATIONS[dest]['purification_channel_alert_error'].format(output_channel.mention), suppress_embeds=True)
         if not type(output_channel) == discord.TextChannel:
-            purification_setup_cmd = await self.find_cmd(self.bot, cmd='purification_setup', group='weekly')
-            return await interaction.followup.send(content=TRANSLATIONS[dest]['check_channel_type_error'].format(purification_setup_cmd.mention))
+            purification_setup_cmd = self.bot.command_registry.mention('purification_setup', group='weekly')
+            return await interaction.followup.send(content=TRANSLATIONS[dest]['check_channel_type_error'].format(purification_setup_cmd))
         if role_to_mention:
             role_id = role_to_mention.id
         else:
@@ -89,6 +60,8 @@ class WeeklysCog(commands.GroupCog, name='weekly'):
             insert_stmt = insert(Purification).values(guild_id=interaction.guild_id,channel_id=output_channel.id,role_id=role_id,reset_day=day_num,auto_delete=auto_delete)
             update = insert_stmt.on_conflict_do_update(constraint='purification_reset_day_unique_guildid', set_={'channel_id': output_channel.id, 'role_id': role_id, 'reset_day': day_num, 'auto_delete': auto_delete})
             await conn.execute(update)
+        self.bot.subscriptions.subscribe('purification', interaction.guild_id, output_channel.id, role_id, auto_delete=auto_delete, param=day_num)
+        await self.bot.webhooks.ensure(output_channel)
         await output_channel.send(content=TRANSLATIONS[dest]['setup_purification_channel_ping'].format(interaction.user.mention))
         msg = await interaction.followup.send(content=TRANSLATIONS[dest]['setup_purification_success'].format(output_channel.mention, calendar.day_name[day_num-1] if day != "None" else 'None', role_to_mention.mention if role_to_mention else '`None`'), suppress_embeds=True, wait=True)
         await msg.delete(delay=60)
@@ -104,12 +77,12 @@ class WeeklysCog(commands.GroupCog, name='weekly'):
         await interaction.response.defer(ephemeral=True)
         day_num = await self.day_to_number(day)
         auto_dict = {"On": True, "Off": False}
-        dest = await self.get_language(interaction.guild)
+        dest = await self.bot.guild_settings.get_language(interaction.guild)
         if not output_channel.permissions_for(output_channel.guild.me).send_messages or not output_channel.permissions_for(output_channel.guild.me).view_channel or not output_channel.permissions_for(output_channel.guild.me).embed_links:
             return await interaction.followup.send(content=TRANSLATIONS[dest]['controller_channel_alert_error'].format(output_channel.mention), suppress_embeds=True)
         if not type(output_channel) == discord.TextChannel:
-            controller_setup_cmd = await self.find_cmd(self.bot, cmd='controller_setup', group='weekly')
-            return await interaction.followup.send(content=TRANSLATIONS[dest]['check_channel_type_error'].format(controller_setup_cmd.mention))
+            controller_setup_cmd = self.bot.command_registry.mention('controller_setup', group='weekly')
+            return await interaction.followup.send(content=TRANSLATIONS[dest]['check_channel_type_error'].format(controller_setup_cmd))
         if role_to_mention:
             role_id = role_to_mention.id
         else:
@@ -118,6 +91,8 @@ class WeeklysCog(commands.GroupCog, name='weekly'):
             insert_stmt = insert(Controller).values(guild_id=interaction.guild_id,channel_id=output_channel.id,role_id=role_id,reset_day=day_num,auto_delete=auto_dict.get(auto_delete))
             update = insert_stmt.on_conflict_do_update(constraint='controller_reset_day_unique_guildid', set_={'channel_id': output_channel.id, 'role_id': role_id, 'reset_day': day_num, 'auto_delete': auto_dict.get(auto_delete)})
             await conn.execute(update)
+        self.bot.subscriptions.subscribe('controller', interaction.guild_id, output_channel.id, role_id, auto_delete=auto_dict.get(auto_delete), param=day_num)
+        await self.bot.webhooks.ensure(output_channel)
         await output_channel.send(content=TRANSLATIONS[dest]['setup_controller_channel_ping'].format(interaction.user.mention))
         msg = await interaction.followup.send(content=TRANSLATIONS[dest]['setup_controller_success'].format(output_channel.mention, calendar.day_name[day_num-1] if isinstance(day_num, int) else 'None', role_to_mention.mention if role_to_mention else '`None`'), suppress_embeds=True, wait=True)
         await msg.delete(delay=60)
@@ -131,12 +106,12 @@ class WeeklysCog(commands.GroupCog, name='weekly'):
     async def sproutlet_alert_setup(self, interaction: discord.Interaction, output_channel: discord.TextChannel, hour: Literal[0,1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23], role_to_mention: Optional[discord.Role] = None, auto_delete: Optional[Literal['On', 'Off']] = 'Off'):
         await interaction.response.defer(ephemeral=True)
         auto_dict = {"On": True, "Off": False}
-        dest = await self.get_language(interaction.guild)
+        dest = await self.bot.guild_settings.get_language(interaction.guild)
         if not output_channel.permissions_for(output_channel.guild.me).send_messages or not output_channel.permissions_for(output_channel.guild.me).view_channel or not output_channel.permissions_for(output_channel.guild.me).embed_links:
             return await interaction.followup.send(content=TRANSLATIONS[dest]['sproutlet_channel_alert_error'].format(output_channel.mention), suppress_embeds=True)
         if not type(output_channel) == discord.TextChannel:
-            sproutlet_setup_cmd = await self.find_cmd(self.bot, cmd='sproutlet_setup', group='weekly')
-            return await interaction.followup.send(content=TRANSLATIONS[dest]['check_channel_type_error'].format(sproutlet_setup_cmd.mention))
+            sproutlet_setup_cmd = self.bot.command_registry.mention('sproutlet_setup', group='weekly')
+            return await interaction.followup.send(content=TRANSLATIONS[dest]['check_channel_type_error'].format(sproutlet_setup_cmd))
         if role_to_mention:
             role_id = role_to_mention.id
         else:
@@ -145,6 +120,8 @@ class WeeklysCog(commands.GroupCog, name='weekly'):
             insert_stmt = insert(Sproutlet).values(guild_id=interaction.guild_id,channel_id=output_channel.id,role_id=role_id,hour=int(hour),auto_delete=auto_dict.get(auto_delete))
             update = insert_stmt.on_conflict_do_update(constraint='sproutlet_unique_guildid', set_={'channel_id': output_channel.id, 'role_id': role_id, 'hour': int(hour), 'auto_delete': auto_dict.get(auto_delete)})
             await conn.execute(update)
+        self.bot.subscriptions.subscribe('sproutlet', interaction.guild_id, output_channel.id, role_id, auto_delete=auto_dict.get(auto_delete), param=int(hour))
+        await self.bot.webhooks.ensure(output_channel)
         await output_channel.send(content=TRANSLATIONS[dest]['setup_sproutlet_channel_ping'].format(interaction.user.mention))
         msg = await interaction.followup.send(content=TRANSLATIONS[dest]['setup_sproutlet_success'].format(output_channel.mention, f'`{hour}:15 UTC`', role_to_mention.mention if role_to_mention else '`None`'), suppress_embeds=True, wait=True)
         await msg.delete(delay=60)
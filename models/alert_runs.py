@@ -0,0 +1,20 @@
+from sqlalchemy import BigInteger, Integer, DateTime, Text, Boolean, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+from datetime import datetime
+
+class Base(DeclarativeBase):
+    pass
+
+class AlertRun(Base):
+    __tablename__ = "alert_runs"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    alert_type: Mapped[str] = mapped_column(Text)
+    fire_time: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+
+class AlertRunDelivery(Base):
+    __tablename__ = "alert_run_deliveries"
+    __table_args__ = (UniqueConstraint('run_id', 'channel_id', name='alert_run_deliveries_unique_run_channel'),)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    run_id: Mapped[int] = mapped_column(Integer, ForeignKey('alert_runs.id', ondelete='CASCADE'))
+    channel_id: Mapped[int] = mapped_column(BigInteger)
+    delivered: Mapped[bool] = mapped_column(Boolean, default=False)
\ No newline at end of file
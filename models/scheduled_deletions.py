@@ -0,0 +1,16 @@
+from sqlalchemy import BigInteger, Integer, DateTime, Boolean, SmallInteger, UniqueConstraint
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+from datetime import datetime
+
+class Base(DeclarativeBase):
+    pass
+
+class ScheduledDeletion(Base):
+    __tablename__ = "scheduled_deletions"
+    __table_args__ = (UniqueConstraint('message_id', name='scheduled_deletions_unique_messageid'),)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    channel_id: Mapped[int] = mapped_column(BigInteger)
+    message_id: Mapped[int] = mapped_column(BigInteger)
+    delete_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
+    via_webhook: Mapped[bool] = mapped_column(Boolean, default=False)
+    attempts: Mapped[int] = mapped_column(SmallInteger, default=0)
\ No newline at end of file
@@ -0,0 +1,15 @@
+from sqlalchemy import BigInteger, Integer, DateTime, String, SmallInteger, UniqueConstraint
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+from datetime import datetime
+
+class Base(DeclarativeBase):
+    pass
+
+class ChannelTombstone(Base):
+    __tablename__ = "channel_tombstones"
+    __table_args__ = (UniqueConstraint('alert_table', 'channel_id', name='channel_tombstones_unique_table_channel'),)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    alert_table: Mapped[str] = mapped_column(String(20))
+    channel_id: Mapped[int] = mapped_column(BigInteger)
+    misses: Mapped[int] = mapped_column(SmallInteger, default=1)
+    last_miss: Mapped[datetime] = mapped_column(DateTime(timezone=True))
\ No newline at end of file
@@ -0,0 +1,22 @@
+from sqlalchemy import BigInteger, Integer, Text, UniqueConstraint
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+class Base(DeclarativeBase):
+    pass
+
+class AlertWebhook(Base):
+    __tablename__ = "alert_webhooks"
+    __table_args__ = (UniqueConstraint('channel_id', name='alert_webhooks_unique_channelid'),)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    guild_id: Mapped[int] = mapped_column(BigInteger)
+    channel_id: Mapped[int] = mapped_column(BigInteger)
+    webhook_id: Mapped[int] = mapped_column(BigInteger)
+    webhook_token: Mapped[str] = mapped_column(Text)
+
+class WebhookIdentity(Base):
+    __tablename__ = "webhook_identities"
+    __table_args__ = (UniqueConstraint('guild_id', name='webhook_identities_unique_guildid'),)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    guild_id: Mapped[int] = mapped_column(BigInteger)
+    username: Mapped[str] = mapped_column(Text, nullable=True)
+    avatar_url: Mapped[str] = mapped_column(Text, nullable=True)
\ No newline at end of file
@@ -0,0 +1,203 @@
+import asyncio
+import io
+import traceback
+from time import monotonic
+from typing import Dict, List, Optional, Set, Tuple
+
+import discord
+from discord.ext import commands
+from sqlalchemy import BigInteger, any_, delete, literal
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from models.channels import CargoScrambleChannel, CrateRespawnChannel, Medics
+from models.events import Lunar
+from models.weekly_resets import Controller, Purification, Sproutlet
+
+# A channel missing permissions is only purged if it is still broken this long after it broke, so admins can finish editing roles.
+# Channels that no longer resolve are left to the tombstones, which confirm the miss over several alert runs.
+HEALTH_GRACE = 60
+HEALTH_INTERVAL = 15
+SUBSCRIPTION_TABLES = {
+    'crate': CrateRespawnChannel,
+    'cargo': CargoScrambleChannel,
+    'purification': Purification,
+    'controller': Controller,
+    'sproutlet': Sproutlet,
+    'medics': Medics,
+    'lunar': Lunar,
+    }
+
+
+def subscription_table(alert_type: str) -> str:
+    # Asian server cargo alerts live in the cargo table.
+    return 'cargo' if alert_type == 'asian_server_cargo' else alert_type
+
+
+def missing_permissions(channel: discord.abc.GuildChannel) -> List[str]:
+    perms = channel.permissions_for(channel.guild.me)
+    perm_errors = []
+    if not perms.send_messages:
+        perm_errors.append('Send Messages')
+    if not perms.view_channel:
+        perm_errors.append('View Channel')
+    if not perms.embed_links:
+        perm_errors.append('Embed Links')
+    return perm_errors
+
+
+class ChannelHealth:
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        # channel_id -> subscription tables it appears in
+        self.subscriptions: Dict[int, Set[str]] = {}
+        self.guild_channels: Dict[int, Set[int]] = {}
+        # channel_id -> (missing permissions, monotonic time it broke)
+        self.broken: Dict[int, Tuple[List[str], float]] = {}
+        self.wake = asyncio.Event()
+        self.worker: Optional[asyncio.Task] = None
+
+    def load(self):
+        for table, columns in self.bot.subscriptions.tables.items(): # type: ignore
+            for channel_id, guild_id, _, _ in columns:
+                self.track(table, guild_id, channel_id)
+
+    def start(self):
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
+
+    def track(self, table: str, guild_id: int, channel_id: int):
+        self.subscriptions.setdefault(channel_id, set()).add(table)
+        self.guild_channels.setdefault(guild_id, set()).add(channel_id)
+
+    def forget(self, channel_ids: List[int]):
+        for channel_id in channel_ids:
+            self.subscriptions.pop(channel_id, None)
+            self.broken.pop(channel_id, None)
+        for guild_id in list(self.guild_channels):
+            channels = self.guild_channels[guild_id]
+            channels.difference_update(channel_ids)
+            if not channels:
+                del self.guild_channels[guild_id]
+
+    def healthy(self, alert_type: str, channel: discord.abc.GuildChannel) -> bool:
+        if channel.id not in self.subscriptions:
+            # Subscribed after startup; picked up on its first alert.
+            self.track(subscription_table(alert_type), channel.guild.id, channel.id)
+            self.check(channel)
+        return channel.id not in self.broken
+
+    def mark(self, channel_id: int, perm_errors: List[str]):
+        if channel_id not in self.subscriptions:
+            return
+        _, since = self.broken.get(channel_id, (None, monotonic()))
+        self.broken[channel_id] = (perm_errors, since)
+        self.wake.set()
+
+    def gone(self, channel_id: int):
+        # A deleted channel, or one hidden by an outage, is purged through the tombstones instead.
+        self.broken.pop(channel_id, None)
+
+    def check(self, channel: discord.abc.GuildChannel):
+        if channel.id not in self.subscriptions:
+            return
+        perm_errors = missing_permissions(channel)
+        if perm_errors:
+            self.mark(channel.id, perm_errors)
+        else:
+            self.broken.pop(channel.id, None)
+
+    def check_guild(self, guild: discord.Guild):
+        for channel_id in list(self.guild_channels.get(guild.id, ())):
+            channel = guild.get_channel(channel_id)
+            if channel is None:
+                self.gone(channel_id)
+            else:
+                self.check(channel)
+
+    def remove_guild(self, guild_id: int):
+        for channel_id in list(self.guild_channels.get(guild_id, ())):
+            self.gone(channel_id)
+
+    def refresh(self):
+        for guild_id in list(self.guild_channels):
+            guild = self.bot.get_guild(guild_id)
+            # Guilds that are missing or unavailable are left to on_guild_remove.
+            if guild is not None and not guild.unavailable:
+                self.check_guild(guild)
+
+    async def run(self):
+        while not self.bot.is_closed():
+            try:
+                await asyncio.wait_for(self.wake.wait(), timeout=HEALTH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self.wake.clear()
+            try:
+                await self.purge_due()
+            except Exception as e:
+                traceback.print_exception(type(e), e, e.__traceback__)
+
+    async def purge_due(self):
+        now = monotonic()
+        purged: Dict[int, List[str]] = {}
+        for channel_id, (perm_errors, since) in list(self.broken.items()):
+            if now - since < HEALTH_GRACE:
+                continue
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                self.gone(channel_id)
+                continue
+            # Fixed during the grace period, or never seen by an event since.
+            perm_errors = missing_permissions(channel) # type: ignore
+            if not perm_errors:
+                del self.broken[channel_id]
+                continue
+            purged[channel_id] = perm_errors
+        if not purged:
+            return
+        by_table: Dict[str, List[int]] = {}
+        for channel_id in purged:
+            for table in self.subscriptions.get(channel_id, ()):
+                by_table.setdefault(table, []).append(channel_id)
+        removed: Dict[str, List[Tuple[int, int]]] = {}
+        async with self.bot.engine.begin() as conn: # type: ignore
+            for table, channel_ids in by_table.items():
+                model = SUBSCRIPTION_TABLES[table]
+                rows = await conn.execute(delete(model).where(model.channel_id == any_(literal(channel_ids, ARRAY(BigInteger)))).returning(model.channel_id, model.guild_id))
+                removed[table] = rows.all()
+        await self.bot.webhooks.discard(list(purged)) # type: ignore
+        for table, channel_ids in by_table.items():
+            self.bot.subscriptions.remove_channels(table, channel_ids) # type: ignore
+            await self.bot.tombstones.clear(table, channel_ids) # type: ignore
+        for channel_id, _ in removed.get('lunar', ()):
+            self.bot.lunar_schedule.remove(channel_id) # type: ignore
+        self.forget(list(purged))
+        self.bot.notifier.hold() # type: ignore
+        try:
+            for table, rows in removed.items():
+                if rows:
+                    self.report(table, rows, purged)
+        finally:
+            self.bot.notifier.release() # type: ignore
+
+    def report(self, table: str, rows: List[Tuple[int, int]], purged: Dict[int, List[str]]):
+        lines = []
+        for channel_id, guild_id in rows:
+            perm_errors = purged[channel_id]
+            guild = self.bot.get_guild(guild_id)
+            queued = guild is not None and self.bot.notifier.notify(guild, f"Your {table} channel was deleted from the bot due to missing `{', '.join(perm_errors)}` permission.  Please re-add it with the appropriate setup command.") # type: ignore
+            guild_name = discord.utils.escape_markdown(guild.name) if guild is not None else 'unknown'
+            lines.append(f"{channel_id} @ {guild_name} (guild_id: {guild_id}) missing `{', '.join(perm_errors)}` permission. {'Queued error message.' if queued else 'Did not send error message.'}")
+        report = "\n".join(lines)
+        tablename = SUBSCRIPTION_TABLES[table].__tablename__
+        summary = f"Deleted {len(rows)} channel{'s' if len(rows) != 1 else ''} from `{tablename}`.\n\n{report}"
+        if len(summary) <= 4096:
+            self.bot.log_sink.log('error', table, summary) # type: ignore
+        else:
+            report_file = discord.File(io.BytesIO(report.encode('utf-8')), filename=f"{table}_purged_channels.txt")
+            self.bot.log_sink.log('error', table, f"Deleted {len(rows)} channels from `{tablename}`.  Full list attached.", file=report_file) # type: ignore
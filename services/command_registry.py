@@ -0,0 +1,30 @@
+from typing import Dict, Optional, Union
+
+import discord
+from discord.ext import commands
+
+
+class CommandRegistry:
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.commands: Dict[str, discord.app_commands.AppCommand] = {}
+
+    async def refresh(self):
+        self.commands = {command.name.lower(): command for command in await self.bot.tree.fetch_commands()}
+
+    def find(self, cmd: str, group: Optional[str] = None) -> Optional[Union[discord.app_commands.AppCommand, discord.app_commands.AppCommandGroup]]:
+        if group is None:
+            return self.commands.get(cmd.lower())
+        cmd_group = self.commands.get(group.lower())
+        if cmd_group is None:
+            return None
+        for child in cmd_group.options:
+            if isinstance(child, discord.app_commands.AppCommandGroup) and child.name.lower() == cmd.lower():
+                return child
+        return None
+
+    def mention(self, cmd: str, group: Optional[str] = None) -> str:
+        command = self.find(cmd, group)
+        if command is not None:
+            return command.mention
+        return f"`/{group} {cmd}`" if group is not None else f"`/{cmd}`"
@@ -0,0 +1,38 @@
+from typing import Dict
+
+from sqlalchemy.ext.asyncio import (AsyncEngine, AsyncSession, async_sessionmaker,
+                                    create_async_engine)
+
+DB_POOL_SIZE = 50
+DB_MAX_OVERFLOW = 10
+DB_POOL_RECYCLE = 30
+
+
+class Database:
+    """The bot's one connection pool.  Cogs and UI components reach it through `bot.db` (or `bot.engine`) instead of building their own."""
+
+    def __init__(self, dsn: str, pool_size: int = DB_POOL_SIZE, max_overflow: int = DB_MAX_OVERFLOW, pool_recycle: int = DB_POOL_RECYCLE):
+        self.engine: AsyncEngine = create_async_engine(dsn, pool_size=pool_size, max_overflow=max_overflow, pool_recycle=pool_recycle)
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    def begin(self):
+        return self.engine.begin()
+
+    def session(self) -> AsyncSession:
+        return self.sessions()
+
+    def pool_stats(self) -> Dict[str, int]:
+        pool = self.engine.pool
+        return {
+            'size': pool.size(), # type: ignore
+            'checked_out': pool.checkedout(), # type: ignore
+            'checked_in': pool.checkedin(), # type: ignore
+            'overflow': pool.overflow(), # type: ignore
+            }
+
+    def pool_report(self) -> str:
+        stats = self.pool_stats()
+        return f"In use: `{stats['checked_out']}` Idle: `{stats['checked_in']}` Overflow: `{stats['overflow']}` Size: `{stats['size']}`"
+
+    async def dispose(self):
+        await self.engine.dispose()
@@ -0,0 +1,113 @@
+import asyncio
+import datetime
+import traceback
+from typing import List, Optional, Tuple
+
+import discord
+from discord.ext import commands
+from sqlalchemy import Integer, any_, delete, func, literal, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+
+from models.scheduled_deletions import Base, ScheduledDeletion
+
+DELETION_BATCH = 100
+DELETION_CONCURRENCY = 5
+DELETION_MAX_SLEEP = 30
+DELETION_RETRY_DELAY = 60
+DELETION_MAX_ATTEMPTS = 5
+DELETION_FLUSH_SIZE = 500
+
+
+class DeletionQueue:
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.buffer: List[Tuple[int, int, datetime.datetime, bool]] = []
+        self.wake = asyncio.Event()
+        self.semaphore = asyncio.Semaphore(DELETION_CONCURRENCY)
+        self.worker: Optional[asyncio.Task] = None
+
+    async def setup(self):
+        async with self.bot.engine.begin() as conn: # type: ignore
+            await conn.run_sync(Base.metadata.create_all)
+
+    def start(self):
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
+        await self.flush()
+
+    def schedule(self, channel_id: int, message_id: int, delay: float, via_webhook: bool = False):
+        self.buffer.append((channel_id, message_id, discord.utils.utcnow() + datetime.timedelta(seconds=delay), via_webhook))
+        if len(self.buffer) >= DELETION_FLUSH_SIZE or delay < DELETION_MAX_SLEEP:
+            self.wake.set()
+
+    async def flush(self):
+        if not self.buffer:
+            return
+        buffer, self.buffer = self.buffer, []
+        try:
+            async with self.bot.engine.begin() as conn: # type: ignore
+                await conn.execute(insert(ScheduledDeletion).on_conflict_do_nothing(constraint='scheduled_deletions_unique_messageid'), [{'channel_id': channel_id, 'message_id': message_id, 'delete_at': delete_at, 'via_webhook': via_webhook, 'attempts': 0} for channel_id, message_id, delete_at, via_webhook in buffer])
+        except Exception:
+            self.buffer = buffer + self.buffer
+            raise
+
+    async def run(self):
+        while not self.bot.is_closed():
+            try:
+                await self.flush()
+                sleep_for = await self.drain()
+            except Exception as e:
+                traceback.print_exception(type(e), e, e.__traceback__)
+                sleep_for = DELETION_MAX_SLEEP
+            self.wake.clear()
+            try:
+                await asyncio.wait_for(self.wake.wait(), timeout=sleep_for)
+            except asyncio.TimeoutError:
+                pass
+
+    async def drain(self) -> float:
+        while True:
+            time_now = discord.utils.utcnow()
+            async with self.bot.engine.begin() as conn: # type: ignore
+                due = await conn.execute(select(ScheduledDeletion.id, ScheduledDeletion.channel_id, ScheduledDeletion.message_id, ScheduledDeletion.via_webhook, ScheduledDeletion.attempts).where(ScheduledDeletion.delete_at <= time_now).order_by(ScheduledDeletion.delete_at).limit(DELETION_BATCH))
+                due = due.all()
+                if not due:
+                    next_due = await conn.scalar(select(func.min(ScheduledDeletion.delete_at)))
+                    if next_due is None:
+                        return DELETION_MAX_SLEEP
+                    return min(DELETION_MAX_SLEEP, max(0.0, (next_due - time_now).total_seconds()))
+            results = await asyncio.gather(*(self.delete_message(channel_id, message_id, via_webhook) for _, channel_id, message_id, via_webhook, _ in due))
+            finished, retry = [], []
+            for (row_id, _, _, _, attempts), done in zip(due, results):
+                if done or attempts + 1 >= DELETION_MAX_ATTEMPTS:
+                    finished.append(row_id)
+                else:
+                    retry.append(row_id)
+            async with self.bot.engine.begin() as conn: # type: ignore
+                if finished:
+                    await conn.execute(delete(ScheduledDeletion).where(ScheduledDeletion.id == any_(literal(finished, ARRAY(Integer)))))
+                if retry:
+                    await conn.execute(update(ScheduledDeletion).where(ScheduledDeletion.id == any_(literal(retry, ARRAY(Integer)))).values(delete_at=time_now + datetime.timedelta(seconds=DELETION_RETRY_DELAY), attempts=ScheduledDeletion.attempts + 1))
+
+    async def delete_message(self, channel_id: int, message_id: int, via_webhook: bool) -> bool:
+        async with self.semaphore:
+            try:
+                webhook = self.bot.webhooks.get(channel_id) if via_webhook else None # type: ignore
+                if webhook is not None:
+                    await webhook.delete_message(message_id)
+                else:
+                    await self.bot.http.delete_message(channel_id, message_id)
+                return True
+            except (discord.NotFound, discord.Forbidden):
+                # Already gone, or we can no longer touch the channel; nothing left to retry.
+                return True
+            except discord.RateLimited as e:
+                await asyncio.sleep(e.retry_after)
+                return False
+            except discord.HTTPException:
+                return False
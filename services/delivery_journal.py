@@ -0,0 +1,86 @@
+import asyncio
+import datetime
+import traceback
+from time import monotonic
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import BigInteger, any_, delete, insert, literal, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from models.alert_runs import AlertRun, AlertRunDelivery, Base
+
+JOURNAL_FLUSH_SIZE = 200
+JOURNAL_FLUSH_INTERVAL = 1.0
+JOURNAL_INSERT_CHUNK = 5000
+
+
+class DeliveryJournal:
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.buffer: Dict[int, List[int]] = {}
+        self.buffered = 0
+        self.last_flush = monotonic()
+        self.flush_lock = asyncio.Lock()
+        self.flush_task: Optional[asyncio.Task] = None
+        # Set by the first TimerCog to resume interrupted runs, so a reloaded cog doesn't resend them.
+        self.resumed = False
+
+    async def setup(self):
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def stop(self):
+        # flush() waits on flush_lock, so an in-flight flush finishes before the rest of the buffer is written.
+        await self.flush()
+
+    async def open_run(self, alert_type: str, fire_time: datetime.datetime, channel_ids: List[int]) -> int:
+        async with self.engine.begin() as conn:
+            run_id = await conn.scalar(insert(AlertRun).values(alert_type=alert_type, fire_time=fire_time).returning(AlertRun.id))
+            for i in range(0, len(channel_ids), JOURNAL_INSERT_CHUNK):
+                chunk = channel_ids[i:i+JOURNAL_INSERT_CHUNK]
+                await conn.execute(insert(AlertRunDelivery), [{'run_id': run_id, 'channel_id': channel_id, 'delivered': False} for channel_id in chunk])
+        return run_id # type: ignore
+
+    def mark_delivered(self, run_id: int, channel_id: int):
+        self.buffer.setdefault(run_id, []).append(channel_id)
+        self.buffered += 1
+        if self.flush_task is not None and not self.flush_task.done():
+            return
+        if self.buffered >= JOURNAL_FLUSH_SIZE or monotonic() - self.last_flush >= JOURNAL_FLUSH_INTERVAL:
+            self.flush_task = asyncio.create_task(self.flush())
+
+    async def flush(self):
+        async with self.flush_lock:
+            buffer, self.buffer = self.buffer, {}
+            self.buffered = 0
+            self.last_flush = monotonic()
+            if not buffer:
+                return
+            try:
+                async with self.engine.begin() as conn:
+                    for run_id, channel_ids in buffer.items():
+                        await conn.execute(update(AlertRunDelivery).where(AlertRunDelivery.run_id == run_id, AlertRunDelivery.channel_id == any_(literal(channel_ids, ARRAY(BigInteger)))).values(delivered=True))
+            except Exception as e:
+                # Keep the entries so the next flush retries them.
+                for run_id, channel_ids in buffer.items():
+                    self.buffer.setdefault(run_id, []).extend(channel_ids)
+                    self.buffered += len(channel_ids)
+                traceback.print_exception(type(e), e, e.__traceback__)
+
+    async def close_run(self, run_id: int):
+        # Buffered deliveries for a finished run no longer need writing.
+        self.buffered -= len(self.buffer.pop(run_id, []))
+        async with self.engine.begin() as conn:
+            await conn.execute(delete(AlertRun).where(AlertRun.id == run_id))
+
+    async def unfinished_runs(self) -> List[Tuple[int, str, datetime.datetime, Set[int]]]:
+        async with self.engine.begin() as conn:
+            runs = await conn.execute(select(AlertRun.id, AlertRun.alert_type, AlertRun.fire_time).order_by(AlertRun.fire_time))
+            runs = runs.all()
+            pending = await conn.execute(select(AlertRunDelivery.run_id, AlertRunDelivery.channel_id).filter_by(delivered=False))
+            pending = pending.all()
+        pending_channels: Dict[int, Set[int]] = {}
+        for run_id, channel_id in pending:
+            pending_channels.setdefault(run_id, set()).add(channel_id)
+        return [(run_id, alert_type, fire_time, pending_channels.get(run_id, set())) for run_id, alert_type, fire_time in runs]
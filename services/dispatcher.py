@@ -0,0 +1,150 @@
+import asyncio
+import datetime
+import math
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import discord
+from dotenv import dotenv_values
+
+from services.metrics import RunMetrics, ShardProgress, current_run, request_rate_limits
+from services.ordering import DeliveryOrdering
+
+config = dotenv_values(".env")
+
+DISPATCH_CONCURRENCY = int(config.get("DISPATCH_CONCURRENCY") or 25)
+MAX_RATELIMIT_RETRIES = 3
+
+
+def shard_for(guild_id: int, shard_count: int) -> int:
+    return (guild_id >> 22) % shard_count
+
+
+class PlannedAlert:
+    __slots__ = ('channel_id', 'channel', 'guild_id', 'premium', 'content', 'embed', 'delete_after')
+
+    def __init__(self, channel_id: int, channel: discord.TextChannel, premium: bool, content: str, embed: discord.Embed, delete_after: Optional[float]):
+        self.channel_id = channel_id
+        self.channel = channel
+        self.guild_id = channel.guild.id
+        self.premium = premium
+        self.content = content
+        self.embed = embed
+        self.delete_after = delete_after
+
+
+class AlertPlan:
+    def __init__(self, alert_type: str, fire_time: datetime.datetime):
+        self.alert_type = alert_type
+        self.fire_time = fire_time
+        self.entries: List[PlannedAlert] = []
+        self.found: Set[int] = set()
+        self.purged: List[Tuple[int, str]] = []
+        # Channels that did not resolve although their shard was ready, and ones whose shard was still loading.
+        self.missing: List[int] = []
+        self.deferred: Dict[int, int] = {}
+        self.unhealthy = 0
+        self.lunar_due: List[int] = []
+        self.metrics: Optional[RunMetrics] = None
+        self.run_id: Optional[int] = None
+
+
+class AlertDispatcher:
+    def __init__(self, concurrency: int = DISPATCH_CONCURRENCY):
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.route_buckets: Dict[int, asyncio.Lock] = {}
+        self.global_clear = asyncio.Event()
+        self.global_clear.set()
+        self.rate_limited = 0
+        self.ordering = DeliveryOrdering()
+
+    def bucket(self, channel_id: int) -> asyncio.Lock:
+        lock = self.route_buckets.get(channel_id)
+        if lock is None:
+            lock = self.route_buckets[channel_id] = asyncio.Lock()
+        return lock
+
+    async def back_off(self, retry_after: float, is_global: bool):
+        self.rate_limited += 1
+        if is_global:
+            # Every route shares the global bucket, so hold all sends until it resets.
+            self.global_clear.clear()
+            try:
+                await asyncio.sleep(retry_after)
+            finally:
+                self.global_clear.set()
+        else:
+            await asyncio.sleep(retry_after)
+
+    def count_unlogged(self, metrics: Optional[RunMetrics], logged: List[int]):
+        # 429s raised without a warning (no Via header, webhook 429s) never reach RateLimitCounter.
+        if metrics is not None and not logged[0]:
+            metrics.rate_limited += 1
+
+    async def send(self, channel_id: int, send: Callable[[], Awaitable[Any]], metrics: Optional[RunMetrics] = None) -> Any:
+        async with self.bucket(channel_id):
+            for _ in range(MAX_RATELIMIT_RETRIES):
+                await self.global_clear.wait()
+                logged = [0]
+                token = request_rate_limits.set(logged)
+                try:
+                    return await send()
+                except discord.RateLimited as e:
+                    self.count_unlogged(metrics, logged)
+                    await self.back_off(e.retry_after, is_global=False)
+                except discord.HTTPException as e:
+                    if e.status != 429:
+                        raise
+                    self.count_unlogged(metrics, logged)
+                    headers = getattr(e.response, 'headers', {})
+                    retry_after = float(headers.get('Retry-After') or 1)
+                    is_global = headers.get('X-RateLimit-Global', '').lower() == 'true' or headers.get('X-RateLimit-Scope') == 'global'
+                    await self.back_off(retry_after, is_global=is_global)
+                finally:
+                    request_rate_limits.reset(token)
+            await self.global_clear.wait()
+            return await send()
+
+    async def fan_out_by_shard(self, entries: List[PlannedAlert], shard_count: int, deliver: Callable[[PlannedAlert], Awaitable[Any]], metrics: Optional[RunMetrics] = None) -> List[Any]:
+        # Each shard drains its own queue with its own workers, so a slow or reconnecting shard only delays its own guilds.
+        # Workers share self.semaphore, which caps sends in flight across every shard and every concurrent run.
+        shard_count = max(1, shard_count)
+        results: List[Any] = [None] * len(entries)
+        queues: Dict[int, asyncio.Queue] = {}
+        for index, entry in enumerate(entries):
+            queues.setdefault(shard_for(entry.guild_id, shard_count), asyncio.Queue()).put_nowait(index)
+        workers_per_shard = max(1, math.ceil(self.concurrency / len(queues))) if queues else 1
+
+        async def worker(queue: asyncio.Queue, progress: ShardProgress):
+            while not queue.empty():
+                index = queue.get_nowait()
+                try:
+                    async with self.semaphore:
+                        results[index] = await deliver(entries[index])
+                except Exception as e:
+                    results[index] = e
+                if results[index] is True:
+                    progress.sent += 1
+                else:
+                    progress.failed += 1
+
+        async def run_shard(shard_id: int, queue: asyncio.Queue):
+            progress = ShardProgress(shard_id, queue.qsize())
+            if metrics is not None:
+                metrics.shards[shard_id] = progress
+            await asyncio.gather(*(worker(queue, progress) for _ in range(min(workers_per_shard, queue.qsize()))))
+            progress.finished = perf_counter()
+            if metrics is not None:
+                print(f"[{metrics.alert_type.upper()}] {progress}")
+
+        token = current_run.set(metrics)
+        try:
+            await asyncio.gather(*(run_shard(shard_id, queue) for shard_id, queue in sorted(queues.items())))
+        finally:
+            current_run.reset(token)
+        return results
+
+    def prune_buckets(self):
+        for channel_id in [c for c, lock in self.route_buckets.items() if not lock.locked()]:
+            del self.route_buckets[channel_id]
@@ -0,0 +1,41 @@
+from typing import Dict, Set
+
+import discord
+from discord.ext import commands
+
+PREMIUM_SKU_ID = 1372073760546488391
+
+
+class PremiumCache:
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.entitlements: Dict[int, int] = {}
+        self.guild_ids: Set[int] = set()
+
+    def is_premium(self, guild_id: int) -> bool:
+        return guild_id in self.guild_ids
+
+    def rebuild(self):
+        self.guild_ids = set(self.entitlements.values())
+
+    async def resync(self):
+        skus = [sku for sku in await self.bot.fetch_skus() if sku.id == PREMIUM_SKU_ID]
+        entitlements = {}
+        async for ent in self.bot.entitlements(skus=skus, exclude_ended=True):
+            if ent.guild_id is not None:
+                entitlements[ent.id] = ent.guild_id
+        self.entitlements = entitlements
+        self.rebuild()
+
+    def update(self, entitlement: discord.Entitlement):
+        if entitlement.sku_id != PREMIUM_SKU_ID or entitlement.guild_id is None:
+            return
+        if entitlement.deleted or entitlement.is_expired():
+            self.entitlements.pop(entitlement.id, None)
+        else:
+            self.entitlements[entitlement.id] = entitlement.guild_id
+        self.rebuild()
+
+    def remove(self, entitlement: discord.Entitlement):
+        if self.entitlements.pop(entitlement.id, None) is not None:
+            self.rebuild()
@@ -0,0 +1,169 @@
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+import discord
+from discord.ext import commands
+from dotenv import dotenv_values
+from sqlalchemy import BigInteger, any_, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from languages import LANGUAGES
+from models.channels import AutoDelete, CargoMutes, CrateMutes
+from models.languages import GuildLanguage
+
+config = dotenv_values(".env")
+
+GUILD_SETTINGS_CAPACITY = int(config.get("GUILD_SETTINGS_CACHE") or 100_000)
+CRATE_MUTE_COLUMNS = ('zero', 'four', 'eight', 'twelve', 'sixteen', 'twenty')
+CARGO_MUTE_COLUMNS = ('twelve', 'fifteen', 'eighteen_thirty', 'twenty_two')
+
+
+class GuildSettings:
+    __slots__ = ('lang', 'auto_delete_crate', 'auto_delete_cargo', 'crate_mutes', 'cargo_mutes')
+
+    def __init__(self):
+        self.lang: Optional[str] = None
+        self.auto_delete_crate = False
+        self.auto_delete_cargo = False
+        # Names of the muted columns in crate_mutes / cargo_mutes.
+        self.crate_mutes: FrozenSet[str] = frozenset()
+        self.cargo_mutes: FrozenSet[str] = frozenset()
+
+
+DEFAULT_SETTINGS = GuildSettings()
+
+
+class GuildSettingsCache:
+    def __init__(self, bot: commands.Bot, capacity: int = GUILD_SETTINGS_CAPACITY):
+        self.bot = bot
+        self.capacity = capacity
+        self.entries: OrderedDict[int, GuildSettings] = OrderedDict()
+        # True while every guild with stored settings is cached, so a miss means the defaults and needs no query.
+        self.complete = False
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    async def load(self):
+        entries: OrderedDict[int, GuildSettings] = OrderedDict()
+        async with self.bot.engine.begin() as conn: # type: ignore
+            languages = await conn.execute(select(GuildLanguage.guild_id, GuildLanguage.lang))
+            for guild_id, lang in languages.all():
+                entries.setdefault(guild_id, GuildSettings()).lang = lang
+            auto_deletes = await conn.execute(select(AutoDelete.guild_id, AutoDelete.crate, AutoDelete.cargo))
+            for guild_id, crate, cargo in auto_deletes.all():
+                settings = entries.setdefault(guild_id, GuildSettings())
+                settings.auto_delete_crate, settings.auto_delete_cargo = bool(crate), bool(cargo)
+            crate_mutes = await conn.execute(select(CrateMutes.guild_id, *[getattr(CrateMutes, column) for column in CRATE_MUTE_COLUMNS]))
+            for guild_id, *muted in crate_mutes.all():
+                entries.setdefault(guild_id, GuildSettings()).crate_mutes = frozenset(column for column, value in zip(CRATE_MUTE_COLUMNS, muted) if value)
+            cargo_mutes = await conn.execute(select(CargoMutes.guild_id, *[getattr(CargoMutes, column) for column in CARGO_MUTE_COLUMNS]))
+            for guild_id, *muted in cargo_mutes.all():
+                entries.setdefault(guild_id, GuildSettings()).cargo_mutes = frozenset(column for column, value in zip(CARGO_MUTE_COLUMNS, muted) if value)
+        self.complete = len(entries) <= self.capacity
+        while len(entries) > self.capacity:
+            entries.popitem(last=False)
+        self.entries = entries
+
+    async def fetch(self, guild_ids: List[int]) -> Dict[int, GuildSettings]:
+        # One query per table however many guilds are missing.
+        fetched = {guild_id: GuildSettings() for guild_id in guild_ids}
+        ids = literal(list(fetched), ARRAY(BigInteger))
+        async with self.bot.engine.begin() as conn: # type: ignore
+            languages = await conn.execute(select(GuildLanguage.guild_id, GuildLanguage.lang).where(GuildLanguage.guild_id == any_(ids)))
+            for guild_id, lang in languages.all():
+                fetched[guild_id].lang = lang
+            auto_deletes = await conn.execute(select(AutoDelete.guild_id, AutoDelete.crate, AutoDelete.cargo).where(AutoDelete.guild_id == any_(ids)))
+            for guild_id, crate, cargo in auto_deletes.all():
+                fetched[guild_id].auto_delete_crate, fetched[guild_id].auto_delete_cargo = bool(crate), bool(cargo)
+            crate_mutes = await conn.execute(select(CrateMutes.guild_id, *[getattr(CrateMutes, column) for column in CRATE_MUTE_COLUMNS]).where(CrateMutes.guild_id == any_(ids)))
+            for guild_id, *muted in crate_mutes.all():
+                fetched[guild_id].crate_mutes = frozenset(column for column, value in zip(CRATE_MUTE_COLUMNS, muted) if value)
+            cargo_mutes = await conn.execute(select(CargoMutes.guild_id, *[getattr(CargoMutes, column) for column in CARGO_MUTE_COLUMNS]).where(CargoMutes.guild_id == any_(ids)))
+            for guild_id, *muted in cargo_mutes.all():
+                fetched[guild_id].cargo_mutes = frozenset(column for column, value in zip(CARGO_MUTE_COLUMNS, muted) if value)
+        return fetched
+
+    def put(self, guild_id: int, settings: GuildSettings):
+        self.entries[guild_id] = settings
+        self.entries.move_to_end(guild_id)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.complete = False
+
+    def cached(self, guild_id: int) -> Optional[GuildSettings]:
+        settings = self.entries.get(guild_id)
+        if settings is not None:
+            self.entries.move_to_end(guild_id)
+        elif self.complete:
+            # Shared and read-only; guilds on the defaults are not stored, so they never push out ones that are not.
+            settings = DEFAULT_SETTINGS
+        return settings
+
+    def editable(self, guild_id: int) -> Optional[GuildSettings]:
+        settings = self.entries.get(guild_id)
+        if settings is None and self.complete:
+            settings = GuildSettings()
+            self.put(guild_id, settings)
+        return settings
+
+    async def get(self, guild_id: int) -> GuildSettings:
+        return (await self.get_many([guild_id]))[guild_id]
+
+    async def get_many(self, guild_ids: Iterable[int]) -> Dict[int, GuildSettings]:
+        # The result, not the cache, is what callers read, so it holds every guild even when there are more misses than capacity.
+        found: Dict[int, GuildSettings] = {}
+        missing: List[int] = []
+        for guild_id in guild_ids:
+            settings = self.cached(guild_id)
+            if settings is None:
+                missing.append(guild_id)
+            else:
+                found[guild_id] = settings
+        if missing:
+            fetched = await self.fetch(missing)
+            for guild_id, settings in fetched.items():
+                self.put(guild_id, settings)
+            found.update(fetched)
+        return found
+
+    def language(self, settings: GuildSettings, guild: discord.Guild) -> str:
+        if settings.lang is not None:
+            return settings.lang
+        return LANGUAGES.get(str(guild.preferred_locale).lower(), 'en')
+
+    async def get_language(self, guild: Optional[discord.Guild]) -> str:
+        if guild is None:
+            return 'en'
+        return self.language(await self.get(guild.id), guild)
+
+    # Called after the database write has committed.  A guild that is not cached is read from the database on its next lookup.
+    def set_language(self, guild_id: int, lang: Optional[str]):
+        settings = self.editable(guild_id)
+        if settings is not None:
+            settings.lang = lang
+
+    def set_auto_delete(self, guild_id: int, crate: Optional[bool] = None, cargo: Optional[bool] = None):
+        settings = self.editable(guild_id)
+        if settings is None:
+            return
+        if crate is not None:
+            settings.auto_delete_crate = crate
+        if cargo is not None:
+            settings.auto_delete_cargo = cargo
+
+    def set_mutes(self, guild_id: int, crate: Optional[FrozenSet[str]] = None, cargo: Optional[FrozenSet[str]] = None):
+        settings = self.editable(guild_id)
+        if settings is None:
+            return
+        if crate is not None:
+            settings.crate_mutes = crate
+        if cargo is not None:
+            settings.cargo_mutes = cargo
+
+    def reset_alerts(self, guild_id: int):
+        settings = self.editable(guild_id)
+        if settings is None:
+            return
+        settings.auto_delete_crate = settings.auto_delete_cargo = False
+        settings.crate_mutes = settings.cargo_mutes = frozenset()
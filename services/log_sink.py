@@ -0,0 +1,109 @@
+import asyncio
+import io
+import re
+import traceback
+from typing import Dict, List, Optional, Tuple
+
+import discord
+from discord.ext import commands
+from dotenv import dotenv_values
+
+config = dotenv_values(".env")
+
+LOG_FLUSH_INTERVAL = 10
+LOG_FLUSH_SIZE = 50
+LOG_COLORS = {'error': discord.Color.red(), 'warn': discord.Color.orange(), 'info': discord.Color.blue()}
+LOG_TITLES = {'error': "Error", 'warn': "Warning", 'info': "Info"}
+
+
+def fingerprint(message: str, error: Optional[BaseException] = None) -> str:
+    if error is not None:
+        frames = traceback.extract_tb(error.__traceback__)
+        location = f"{frames[-1].filename}:{frames[-1].lineno}" if frames else ""
+        return f"{type(error).__name__}@{location}"
+    # Ids, counts and timestamps differ between otherwise identical events.
+    first_line = message.strip().split("\n", 1)[0]
+    return re.sub(r"\d+", "#", first_line)[:120]
+
+
+class LogEvent:
+    __slots__ = ('message', 'silent', 'file', 'delete_after')
+
+    def __init__(self, message: str, silent: bool, file: Optional[discord.File], delete_after: Optional[float]):
+        self.message = message
+        self.silent = silent
+        self.file = file
+        self.delete_after = delete_after
+
+
+class LogSink:
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.groups: Dict[Tuple[str, str, str], List[LogEvent]] = {}
+        self.buffered = 0
+        self.wake = asyncio.Event()
+        self.worker: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
+        await self.flush()
+
+    def log(self, type: str, alert_type: str, message: str, silent: bool = False, file: Optional[discord.File] = None, error: Optional[BaseException] = None, delete_after: Optional[float] = None):
+        key = (type, alert_type, fingerprint(message, error))
+        self.groups.setdefault(key, []).append(LogEvent(message, silent, file, delete_after))
+        self.buffered += 1
+        if self.buffered >= LOG_FLUSH_SIZE:
+            self.wake.set()
+
+    async def run(self):
+        while not self.bot.is_closed():
+            try:
+                await asyncio.wait_for(self.wake.wait(), timeout=LOG_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self.wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                traceback.print_exception(type(e), e, e.__traceback__)
+
+    async def flush(self):
+        if not self.groups:
+            return
+        log_channel: discord.TextChannel = self.bot.get_channel(int(config["LOG_CHAN"])) # type: ignore
+        if log_channel is None:
+            # Not cached yet (startup or a reconnect), so keep the events for the next flush.
+            return
+        groups, self.groups = self.groups, {}
+        self.buffered = 0
+        for (log_type, alert_type, _), events in groups.items():
+            try:
+                await self.send_group(log_channel, log_type, alert_type, events)
+            except discord.HTTPException as e:
+                traceback.print_exception(type(e), e, e.__traceback__)
+
+    async def send_group(self, log_channel: discord.TextChannel, type: str, alert_type: str, events: List[LogEvent]):
+        log_embed = discord.Embed(color=LOG_COLORS.get(type))
+        log_embed.title = f"{LOG_TITLES.get(type, '')} - {alert_type.upper()}"
+        silent = all(event.silent for event in events) or alert_type == 'sproutlet'
+        files = [event.file for event in events if event.file is not None]
+        if len(events) == 1:
+            log_embed.description = events[0].message[:4096]
+        else:
+            log_embed.title += f" (x{len(events)})"
+            detail = "\n\n".join(event.message for event in events)
+            if len(detail) <= 4096:
+                log_embed.description = detail
+            else:
+                log_embed.description = f"{events[0].message[:3800]}\n\n...and {len(events) - 1} similar events.  Full list attached."
+                files.append(discord.File(io.BytesIO(detail.encode('utf-8')), filename=f"{alert_type}_{type}_events.txt"))
+        msg = await log_channel.send(embed=log_embed, silent=silent, files=files[:10])
+        delete_after = max((event.delete_after for event in events if event.delete_after is not None), default=None)
+        if delete_after is not None:
+            self.bot.deletions.schedule(log_channel.id, msg.id, delete_after) # type: ignore
@@ -0,0 +1,71 @@
+import heapq
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from models.events import Lunar
+
+LUNAR_EVENT_LENGTH = 3600
+
+
+class LunarSchedule:
+    def __init__(self):
+        self.heap: List[Tuple[int, int]] = []
+        self.due: Dict[int, int] = {}
+        self.channel_guilds: Dict[int, int] = {}
+        self.guild_channels: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.due)
+
+    async def load(self, engine: AsyncEngine):
+        async with engine.begin() as conn:
+            timers = await conn.execute(select(Lunar.guild_id, Lunar.channel_id, Lunar.last_alert))
+            timers = timers.all()
+        self.heap.clear()
+        self.due.clear()
+        self.channel_guilds.clear()
+        self.guild_channels.clear()
+        for guild_id, channel_id, last_alert in timers:
+            self.schedule(guild_id, channel_id, last_alert + LUNAR_EVENT_LENGTH)
+
+    def schedule(self, guild_id: int, channel_id: int, due: int):
+        old_channel = self.guild_channels.get(guild_id)
+        if old_channel is not None and old_channel != channel_id:
+            self.remove(old_channel)
+        self.guild_channels[guild_id] = channel_id
+        self.channel_guilds[channel_id] = guild_id
+        self.due[channel_id] = due
+        # Old heap entries for this channel are skipped when popped.
+        heapq.heappush(self.heap, (due, channel_id))
+        if len(self.heap) > 2 * len(self.due) + 64:
+            self.heap = [(due, channel_id) for channel_id, due in self.due.items()]
+            heapq.heapify(self.heap)
+
+    def reschedule(self, channel_ids: Iterable[int], due: int):
+        for channel_id in channel_ids:
+            guild_id = self.channel_guilds.get(channel_id)
+            if guild_id is not None:
+                self.schedule(guild_id, channel_id, due)
+
+    def remove(self, channel_id: int):
+        self.due.pop(channel_id, None)
+        guild_id = self.channel_guilds.pop(channel_id, None)
+        if guild_id is not None and self.guild_channels.get(guild_id) == channel_id:
+            del self.guild_channels[guild_id]
+
+    def remove_guild(self, guild_id: int):
+        channel_id = self.guild_channels.get(guild_id)
+        if channel_id is not None:
+            self.remove(channel_id)
+
+    def pop_due(self, now: int) -> List[int]:
+        due_channels = []
+        while self.heap and self.heap[0][0] <= now:
+            due, channel_id = heapq.heappop(self.heap)
+            if self.due.get(channel_id) != due:
+                continue
+            del self.due[channel_id]
+            due_channels.append(channel_id)
+        return due_channels
@@ -0,0 +1,150 @@
+import datetime
+import logging
+import math
+from collections import Counter, deque
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+import discord
+
+LATENCY_WINDOW = 5000
+RUN_HISTORY = 25
+# discord.py retries most 429s itself and only logs them, on these loggers.
+RATE_LIMIT_LOGGERS = ('discord.http', 'discord.webhook.async_')
+# The warnings it logs once per 429 response; its other rate limit lines (global lock, exhausted buckets) are not 429s.
+RATE_LIMIT_WARNINGS = ('responded with 429', 'is rate limited')
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def summarize(samples: Iterable[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'p50': percentile(ordered, 50),
+        'p95': percentile(ordered, 95),
+        'p99': percentile(ordered, 99),
+        'max': ordered[-1] if ordered else 0.0,
+        }
+
+
+def format_summary(summary: Dict[str, float]) -> str:
+    return f"n=`{summary['count']:,}` p50=`{summary['p50']:.2f}s` p95=`{summary['p95']:.2f}s` p99=`{summary['p99']:.2f}s` max=`{summary['max']:.2f}s`"
+
+
+class ShardProgress:
+    def __init__(self, shard_id: int, total: int):
+        self.shard_id = shard_id
+        self.total = total
+        self.sent = 0
+        self.failed = 0
+        self.started = perf_counter()
+        self.finished: Optional[float] = None
+
+    @property
+    def done(self) -> int:
+        return self.sent + self.failed
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or perf_counter()) - self.started
+
+    def __str__(self) -> str:
+        return f"Shard {self.shard_id}: `{self.done:,}/{self.total:,}` sent=`{self.sent:,}` failed=`{self.failed:,}` in `{self.elapsed:.2f}s`"
+
+
+class RunMetrics:
+    def __init__(self, alert_type: str, fire_time: datetime.datetime):
+        self.alert_type = alert_type
+        self.fire_time = fire_time
+        self.samples: List[Tuple[Optional[int], float]] = []
+        self.shards: Dict[int, ShardProgress] = {}
+        self.rate_limited = 0
+        self.errors = 0
+
+    def record(self, shard_id: Optional[int]):
+        self.samples.append((shard_id, (discord.utils.utcnow() - self.fire_time).total_seconds()))
+
+    def summary(self) -> Dict[str, float]:
+        return summarize(latency for _, latency in self.samples)
+
+    def shard_summaries(self) -> Dict[Optional[int], Dict[str, float]]:
+        by_shard: Dict[Optional[int], List[float]] = {}
+        for shard_id, latency in self.samples:
+            by_shard.setdefault(shard_id, []).append(latency)
+        return {shard_id: summarize(latencies) for shard_id, latencies in sorted(by_shard.items(), key=lambda s: -1 if s[0] is None else s[0])}
+
+    def shard_report(self) -> str:
+        return "\n".join(str(progress) for _, progress in sorted(self.shards.items()))
+
+    def slowest_shard(self) -> Optional[ShardProgress]:
+        return max(self.shards.values(), key=lambda p: p.elapsed, default=None)
+
+
+# The run whose sends are in flight in the current task, so logged 429s can be attributed to it.
+current_run: ContextVar[Optional[RunMetrics]] = ContextVar('current_run', default=None)
+# Rate limit warnings logged during the request in flight, so the dispatcher only counts the 429s discord.py raised silently.
+request_rate_limits: ContextVar[Optional[List[int]]] = ContextVar('request_rate_limits', default=None)
+
+
+class RateLimitCounter(logging.Handler):
+    """Counts the rate limit warnings discord.py logs before retrying a request."""
+    def __init__(self):
+        super().__init__(logging.WARNING)
+
+    def emit(self, record: logging.LogRecord):
+        if record.levelno != logging.WARNING or not any(warning in str(record.msg) for warning in RATE_LIMIT_WARNINGS):
+            return
+        run = current_run.get()
+        if run is not None:
+            run.rate_limited += 1
+        logged = request_rate_limits.get()
+        if logged is not None:
+            logged[0] += 1
+
+    def install(self):
+        for name in RATE_LIMIT_LOGGERS:
+            logging.getLogger(name).addHandler(self)
+
+    def uninstall(self):
+        for name in RATE_LIMIT_LOGGERS:
+            logging.getLogger(name).removeHandler(self)
+
+
+class AlertMetrics:
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.shard_latencies: Dict[Tuple[str, Optional[int]], Deque[float]] = {}
+        self.rate_limited: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.runs: Deque[Tuple[RunMetrics, Dict[str, float]]] = deque(maxlen=RUN_HISTORY)
+
+    def start_run(self, alert_type: str, fire_time: datetime.datetime) -> RunMetrics:
+        return RunMetrics(alert_type, fire_time)
+
+    def finish_run(self, run: RunMetrics):
+        latencies = self.latencies.setdefault(run.alert_type, deque(maxlen=self.window))
+        for shard_id, latency in run.samples:
+            latencies.append(latency)
+            self.shard_latencies.setdefault((run.alert_type, shard_id), deque(maxlen=self.window)).append(latency)
+        self.rate_limited[run.alert_type] += run.rate_limited
+        self.errors[run.alert_type] += run.errors
+        self.runs.append((run, run.summary()))
+
+    def report(self) -> str:
+        if not self.latencies:
+            return "No alert runs recorded yet."
+        report = ""
+        for alert_type, latencies in sorted(self.latencies.items()):
+            report += f"### {alert_type}\n{format_summary(summarize(latencies))}\n429s: `{self.rate_limited[alert_type]:,}` Errors: `{self.errors[alert_type]:,}`\n"
+            for (shard_type, shard_id), shard_latencies in sorted(self.shard_latencies.items(), key=lambda s: (s[0][0], -1 if s[0][1] is None else s[0][1])):
+                if shard_type == alert_type:
+                    report += f"- Shard {shard_id}: {format_summary(summarize(shard_latencies))}\n"
+        return report
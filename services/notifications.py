@@ -0,0 +1,76 @@
+import asyncio
+import traceback
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
+
+import discord
+from discord.ext import commands
+
+NOTIFY_WINDOW = 3600
+NOTIFY_MAX_WINDOW = 7 * 86400
+# A guild that has been quiet this long starts again from the shortest window.
+NOTIFY_RESET_AFTER = 3 * 86400
+NOTIFY_MAX_LINES = 10
+
+
+class GuildNotifier:
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.pending: Dict[int, List[str]] = {}
+        # guild_id -> (strikes, monotonic time of the next allowed message, monotonic time of the last problem)
+        self.backoff: Dict[int, Tuple[int, float, float]] = {}
+        self.active_runs = 0
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.flush_task: Optional[asyncio.Task] = None
+
+    def hold(self):
+        self.active_runs += 1
+        self.idle.clear()
+
+    def release(self):
+        self.active_runs = max(0, self.active_runs - 1)
+        if self.active_runs == 0:
+            self.idle.set()
+            if self.pending and (self.flush_task is None or self.flush_task.done()):
+                self.flush_task = asyncio.create_task(self.flush())
+
+    def notify(self, guild: discord.Guild, line: str) -> bool:
+        if guild.system_channel is None:
+            return False
+        now = monotonic()
+        strikes, next_allowed, last_problem = self.backoff.get(guild.id, (0, 0.0, now))
+        if now - last_problem > NOTIFY_RESET_AFTER:
+            strikes, next_allowed = 0, 0.0
+        self.backoff[guild.id] = (strikes, next_allowed, now)
+        lines = self.pending.setdefault(guild.id, [])
+        if line not in lines and len(lines) < NOTIFY_MAX_LINES:
+            lines.append(line)
+        return True
+
+    async def flush(self):
+        now = monotonic()
+        for guild_id in [g for g, (_, next_allowed, _) in self.backoff.items() if g in self.pending and next_allowed <= now]:
+            # Alert runs always go first; wait for any fan-out in progress to finish.
+            await self.idle.wait()
+            lines = self.pending.pop(guild_id, None)
+            guild = self.bot.get_guild(guild_id)
+            if not lines or guild is None or guild.system_channel is None:
+                continue
+            strikes, _, last_problem = self.backoff[guild_id]
+            self.backoff[guild_id] = (strikes + 1, monotonic() + min(NOTIFY_MAX_WINDOW, NOTIFY_WINDOW * 2 ** strikes), last_problem)
+            support_cmd = self.bot.command_registry.mention('support') # type: ignore
+            feedback_cmd = self.bot.command_registry.mention('feedback') # type: ignore
+            content = "\n".join(f"- {line}" for line in lines)
+            try:
+                await guild.system_channel.send(f"There were problems with this server's alerts:\n{content}\nIf this happens multiple times, please contact me on the support server ({support_cmd}) or send a bug report ({feedback_cmd}).")
+            except discord.HTTPException:
+                pass
+            except Exception as e:
+                traceback.print_exception(type(e), e, e.__traceback__)
+        self.prune()
+
+    def prune(self):
+        now = monotonic()
+        for guild_id in [g for g, (_, _, last_problem) in self.backoff.items() if now - last_problem > NOTIFY_RESET_AFTER and g not in self.pending]:
+            del self.backoff[guild_id]
@@ -0,0 +1,98 @@
+import random
+from typing import Callable, Dict, List
+
+from dotenv import dotenv_values
+
+config = dotenv_values(".env")
+
+DELIVERY_ORDER = config.get("DELIVERY_ORDER") or 'round_robin'
+# Golden ratio stride, so successive round-robin starts spread evenly over the list whatever its length.
+ROUND_ROBIN_STRIDE = 0.6180339887
+LATE_POSITION = 0.9
+
+
+class PositionStats:
+    __slots__ = ('runs', 'total', 'worst')
+
+    def __init__(self):
+        self.runs = 0
+        self.total = 0.0
+        self.worst = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.runs if self.runs else 0.0
+
+
+def premium_first(entries: List, offset: float) -> List:
+    return sorted(entries, key=lambda e: not e.premium)
+
+
+def largest_first(entries: List, offset: float) -> List:
+    return sorted(entries, key=lambda e: -(e.channel.guild.member_count or 0))
+
+
+def round_robin(entries: List, offset: float) -> List:
+    ordered = sorted(entries, key=lambda e: e.guild_id)
+    if not ordered:
+        return ordered
+    start = int(offset * len(ordered))
+    return ordered[start:] + ordered[:start]
+
+
+def shuffled(entries: List, offset: float) -> List:
+    ordered = list(entries)
+    random.shuffle(ordered)
+    return ordered
+
+
+ORDERING_POLICIES: Dict[str, Callable[[List, float], List]] = {
+    'premium_first': premium_first,
+    'largest_first': largest_first,
+    'round_robin': round_robin,
+    'random': shuffled,
+    }
+
+
+class DeliveryOrdering:
+    def __init__(self, policy: str = DELIVERY_ORDER):
+        if policy not in ORDERING_POLICIES:
+            print(f"Unknown DELIVERY_ORDER {policy!r}, using round_robin.")
+            policy = 'round_robin'
+        self.policy = policy
+        self.offsets: Dict[str, float] = {}
+        self.positions: Dict[str, Dict[int, PositionStats]] = {}
+
+    def offset(self, alert_type: str) -> float:
+        return self.offsets.get(alert_type, 0.0)
+
+    def advance(self, alert_type: str):
+        # Once per fire, so every plan built for one fire (prepared, rebuilt or late) starts from the same offset.
+        self.offsets[alert_type] = (self.offset(alert_type) + ROUND_ROBIN_STRIDE) % 1
+
+    def order(self, entries: List, offset: float) -> List:
+        return ORDERING_POLICIES[self.policy](entries, offset)
+
+    def record(self, alert_type: str, entries: List):
+        if len(entries) < 2:
+            return
+        positions = self.positions.setdefault(alert_type, {})
+        last = len(entries) - 1
+        for index, entry in enumerate(entries):
+            stats = positions.get(entry.guild_id)
+            if stats is None:
+                stats = positions[entry.guild_id] = PositionStats()
+            position = index / last
+            stats.runs += 1
+            stats.total += position
+            stats.worst = max(stats.worst, position)
+
+    def report(self) -> str:
+        if not self.positions:
+            return f"Policy: `{self.policy}`\nNo runs recorded yet."
+        report = f"Policy: `{self.policy}`\n"
+        for alert_type, positions in sorted(self.positions.items()):
+            late = sum(1 for stats in positions.values() if stats.mean >= LATE_POSITION)
+            highest_mean = max(stats.mean for stats in positions.values())
+            report += f"- {alert_type}: guilds=`{len(positions):,}` mean≥{LATE_POSITION:.0%}=`{late:,}` highest mean=`{highest_mean:.0%}`\n"
+        return report
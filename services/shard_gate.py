@@ -0,0 +1,32 @@
+import asyncio
+from typing import Dict, Iterable, Set
+
+
+class ShardGate:
+    def __init__(self):
+        self.events: Dict[int, asyncio.Event] = {}
+
+    def event(self, shard_id: int) -> asyncio.Event:
+        event = self.events.get(shard_id)
+        if event is None:
+            event = self.events[shard_id] = asyncio.Event()
+        return event
+
+    def ready(self, shard_id: int):
+        self.event(shard_id).set()
+
+    def is_ready(self, shard_id: int) -> bool:
+        return self.event(shard_id).is_set()
+
+    async def wait(self, shard_ids: Iterable[int], timeout: float) -> Set[int]:
+        """Wait up to `timeout` seconds for the shards to finish loading their guilds; returns the ones that did."""
+        shard_ids = set(shard_ids)
+        waiting = [asyncio.create_task(self.event(shard_id).wait()) for shard_id in shard_ids if not self.is_ready(shard_id)]
+        if waiting and timeout > 0:
+            _, pending = await asyncio.wait(waiting, timeout=timeout)
+            for task in pending:
+                task.cancel()
+        else:
+            for task in waiting:
+                task.cancel()
+        return {shard_id for shard_id in shard_ids if self.is_ready(shard_id)}
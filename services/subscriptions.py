@@ -0,0 +1,252 @@
+import datetime
+from array import array
+from bisect import bisect_left
+from itertools import compress
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from models.channels import (AutoDelete, CargoMutes, CargoScrambleChannel,
+                             CrateMutes, CrateRespawnChannel, Medics)
+from models.events import Lunar
+from models.weekly_resets import Controller, Purification, Sproutlet
+from services.channel_health import SUBSCRIPTION_TABLES, subscription_table
+from services.guild_settings import CARGO_MUTE_COLUMNS, CRATE_MUTE_COLUMNS
+
+FLAG_AUTO_DELETE = 1 << 0
+FLAG_ASIAN_SERVER = 1 << 1
+# Crate and cargo alerts only go to guilds with auto_delete and mute rows, like the inner joins they replace.
+FLAG_CONFIGURED = 1 << 2
+MUTE_SHIFT = 3
+# reset_day for purification/controller, hour for sproutlet.
+PARAM_SHIFT = 16
+# Fire hour -> muted column, as filtered by the old per-run queries.
+CRATE_MUTE_HOURS = {0: 'zero', 4: 'four', 8: 'eight', 12: 'twelve', 16: 'sixteen', 20: 'twenty'}
+CARGO_MUTE_HOURS = {11: 'twelve', 14: 'fifteen', 18: 'eighteen_thirty', 21: 'twenty_two'}
+MUTE_COLUMNS = {'crate': CRATE_MUTE_COLUMNS, 'cargo': CARGO_MUTE_COLUMNS}
+
+# (channel_id, guild_id, role_id or None, auto_delete)
+Recipient = Tuple[int, int, Optional[int], bool]
+
+
+def mute_flags(table: str, columns: Iterable[str]) -> int:
+    order = MUTE_COLUMNS[table]
+    flags = 0
+    for column in columns:
+        flags |= 1 << (MUTE_SHIFT + order.index(column))
+    return flags
+
+
+def mute_bit(table: str, hour: int) -> int:
+    column = (CRATE_MUTE_HOURS if table == 'crate' else CARGO_MUTE_HOURS).get(hour)
+    if column is None:
+        return 0
+    return 1 << (MUTE_SHIFT + MUTE_COLUMNS[table].index(column))
+
+
+class SubscriptionColumns:
+    """One subscription table as parallel int64 columns, one row per guild sorted by guild_id; a role_id of 0 means no role.
+
+    Rows are found by bisecting guild_ids rather than through a guild -> row dict, which would take several times the
+    memory of the columns themselves. Writes shift the rows after them, which is cheap at command rates.
+    """
+    __slots__ = ('channel_ids', 'guild_ids', 'role_ids', 'flags')
+
+    def __init__(self):
+        self.channel_ids = array('q')
+        self.guild_ids = array('q')
+        self.role_ids = array('q')
+        self.flags = array('q')
+
+    def __len__(self) -> int:
+        return len(self.guild_ids)
+
+    def __iter__(self) -> Iterator[Tuple[int, int, int, int]]:
+        return zip(self.channel_ids, self.guild_ids, self.role_ids, self.flags)
+
+    def recipients(self) -> Iterator[Recipient]:
+        for channel_id, guild_id, role_id, flags in self:
+            yield channel_id, guild_id, role_id or None, bool(flags & FLAG_AUTO_DELETE)
+
+    def position(self, guild_id: int) -> Optional[int]:
+        position = bisect_left(self.guild_ids, guild_id)
+        if position < len(self.guild_ids) and self.guild_ids[position] == guild_id:
+            return position
+        return None
+
+    def get_flags(self, guild_id: int) -> Optional[int]:
+        position = self.position(guild_id)
+        return self.flags[position] if position is not None else None
+
+    def append(self, channel_id: int, guild_id: int, role_id: int, flags: int):
+        # Callers append in guild_id order.
+        self.channel_ids.append(channel_id)
+        self.guild_ids.append(guild_id)
+        self.role_ids.append(role_id)
+        self.flags.append(flags)
+
+    def select(self, mask: Optional[List[bool]] = None) -> 'SubscriptionColumns':
+        # A copy of the rows where mask is true, or of every row.
+        selected = SubscriptionColumns()
+        for name in self.__slots__:
+            column = getattr(self, name)
+            setattr(selected, name, array('q', column if mask is None else compress(column, mask)))
+        return selected
+
+    def upsert(self, guild_id: int, channel_id: int, role_id: Optional[int], flags: int):
+        position = bisect_left(self.guild_ids, guild_id)
+        if position < len(self.guild_ids) and self.guild_ids[position] == guild_id:
+            self.channel_ids[position] = channel_id
+            self.role_ids[position] = role_id or 0
+            self.flags[position] = flags
+        elif position == len(self.guild_ids):
+            self.append(channel_id, guild_id, role_id or 0, flags)
+        else:
+            self.channel_ids.insert(position, channel_id)
+            self.guild_ids.insert(position, guild_id)
+            self.role_ids.insert(position, role_id or 0)
+            self.flags.insert(position, flags)
+
+    def update_flags(self, guild_id: int, set_bits: int = 0, clear_bits: int = 0):
+        position = self.position(guild_id)
+        if position is not None:
+            self.flags[position] = (self.flags[position] & ~clear_bits) | set_bits
+
+    def delete(self, position: int):
+        for column in (self.channel_ids, self.guild_ids, self.role_ids, self.flags):
+            del column[position]
+
+    def remove(self, guild_id: int):
+        position = self.position(guild_id)
+        if position is not None:
+            self.delete(position)
+
+    def remove_channels(self, channel_ids: Iterable[int]):
+        channel_ids = set(channel_ids)
+        # Back to front, so deleting a row doesn't move the ones still to delete.
+        for position in [position for position, channel_id in enumerate(self.channel_ids) if channel_id in channel_ids][::-1]:
+            self.delete(position)
+
+    def nbytes(self) -> int:
+        return sum(column.itemsize * column.buffer_info()[1] for column in (self.channel_ids, self.guild_ids, self.role_ids, self.flags))
+
+
+class SubscriptionStore:
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.tables: Dict[str, SubscriptionColumns] = {table: SubscriptionColumns() for table in SUBSCRIPTION_TABLES}
+        # Changes made while a reload is reading the database, replayed onto the new snapshot.
+        self.replay: Optional[List[Callable[[Dict[str, SubscriptionColumns]], None]]] = None
+
+    def __len__(self) -> int:
+        return sum(len(columns) for columns in self.tables.values())
+
+    async def load(self):
+        self.replay = []
+        try:
+            tables = {table: SubscriptionColumns() for table in SUBSCRIPTION_TABLES}
+            # Ordered by guild_id so every upsert appends instead of shifting the rows after it.
+            async with self.engine.begin() as conn:
+                crate = await conn.execute(select(CrateRespawnChannel.guild_id, CrateRespawnChannel.channel_id, CrateRespawnChannel.role_id, AutoDelete.crate, *[getattr(CrateMutes, column) for column in CRATE_MUTE_COLUMNS]).outerjoin(AutoDelete, AutoDelete.guild_id == CrateRespawnChannel.guild_id).outerjoin(CrateMutes, CrateMutes.guild_id == CrateRespawnChannel.guild_id).order_by(CrateRespawnChannel.guild_id))
+                for guild_id, channel_id, role_id, auto_delete, *muted in crate:
+                    tables['crate'].upsert(guild_id, channel_id, role_id, self.settings_flags('crate', auto_delete, muted))
+                cargo = await conn.execute(select(CargoScrambleChannel.guild_id, CargoScrambleChannel.channel_id, CargoScrambleChannel.role_id, CargoScrambleChannel.asian_server, AutoDelete.cargo, *[getattr(CargoMutes, column) for column in CARGO_MUTE_COLUMNS]).outerjoin(AutoDelete, AutoDelete.guild_id == CargoScrambleChannel.guild_id).outerjoin(CargoMutes, CargoMutes.guild_id == CargoScrambleChannel.guild_id).order_by(CargoScrambleChannel.guild_id))
+                for guild_id, channel_id, role_id, asian_server, auto_delete, *muted in cargo:
+                    tables['cargo'].upsert(guild_id, channel_id, role_id, self.settings_flags('cargo', auto_delete, muted) | (FLAG_ASIAN_SERVER if asian_server else 0))
+                for table, model, param in [('purification', Purification, Purification.reset_day), ('controller', Controller, Controller.reset_day), ('sproutlet', Sproutlet, Sproutlet.hour)]:
+                    rows = await conn.execute(select(model.guild_id, model.channel_id, model.role_id, model.auto_delete, param).order_by(model.guild_id))
+                    for guild_id, channel_id, role_id, auto_delete, value in rows:
+                        tables[table].upsert(guild_id, channel_id, role_id, (FLAG_AUTO_DELETE if auto_delete else 0) | (value or 0) << PARAM_SHIFT)
+                for table, model in [('medics', Medics), ('lunar', Lunar)]:
+                    rows = await conn.execute(select(model.guild_id, model.channel_id, model.role_id, model.auto_delete).order_by(model.guild_id))
+                    for guild_id, channel_id, role_id, auto_delete in rows:
+                        tables[table].upsert(guild_id, channel_id, role_id, FLAG_AUTO_DELETE if auto_delete else 0)
+            for change in self.replay:
+                change(tables)
+            self.tables = tables
+        finally:
+            self.replay = None
+
+    def settings_flags(self, table: str, auto_delete: Optional[bool], muted: List[Optional[bool]]) -> int:
+        if auto_delete is None or muted[0] is None:
+            return 0
+        return FLAG_CONFIGURED | (FLAG_AUTO_DELETE if auto_delete else 0) | mute_flags(table, [column for column, value in zip(MUTE_COLUMNS[table], muted) if value])
+
+    def apply(self, change: Callable[[Dict[str, SubscriptionColumns]], None]):
+        change(self.tables)
+        if self.replay is not None:
+            self.replay.append(change)
+
+    def recipients(self, alert_type: str, fire_time: datetime.datetime, lunar_due: Optional[Iterable[int]] = None, lunar_guilds: Optional[Mapping[int, int]] = None) -> SubscriptionColumns:
+        """The rows due at fire_time, copied into their own columns so the plan can await without the store changing under it.
+
+        Lunar alerts only go to lunar_due, whose rows are found through lunar_guilds (channel_id -> guild_id) instead of
+        by scanning the table.
+        """
+        table = subscription_table(alert_type)
+        columns = self.tables[table]
+        if alert_type == 'lunar':
+            due = SubscriptionColumns()
+            lunar_guilds = lunar_guilds or {}
+            guild_channels = {lunar_guilds[channel_id]: channel_id for channel_id in lunar_due or () if channel_id in lunar_guilds}
+            for guild_id in sorted(guild_channels):
+                position = columns.position(guild_id)
+                if position is not None and columns.channel_ids[position] == guild_channels[guild_id]:
+                    due.append(columns.channel_ids[position], guild_id, columns.role_ids[position], columns.flags[position])
+            return due
+        if alert_type in ('crate', 'cargo', 'asian_server_cargo'):
+            # Configured, not muted this hour and on the right server, in one mask and compare.
+            checked = FLAG_CONFIGURED | mute_bit(table, fire_time.hour) | FLAG_ASIAN_SERVER
+            wanted = FLAG_CONFIGURED | (FLAG_ASIAN_SERVER if alert_type == 'asian_server_cargo' else 0)
+            return columns.select([flags & checked == wanted for flags in columns.flags])
+        if alert_type in ('purification', 'controller', 'sproutlet'):
+            param = fire_time.isoweekday() if alert_type != 'sproutlet' else fire_time.hour
+            return columns.select([flags >> PARAM_SHIFT == param for flags in columns.flags])
+        return columns.select()
+
+    # Called by the commands after their database write has committed.
+    def subscribe(self, table: str, guild_id: int, channel_id: int, role_id: Optional[int], auto_delete: bool = False, mutes: FrozenSet[str] = frozenset(), asian_server: bool = False, param: Optional[int] = None):
+        flags = (FLAG_AUTO_DELETE if auto_delete else 0) | (FLAG_ASIAN_SERVER if asian_server else 0) | (param or 0) << PARAM_SHIFT
+        if table in MUTE_COLUMNS:
+            flags |= FLAG_CONFIGURED | mute_flags(table, mutes)
+        self.apply(lambda tables: tables[table].upsert(guild_id, channel_id, role_id, flags))
+
+    def set_auto_delete(self, table: str, guild_id: int, auto_delete: bool):
+        if auto_delete:
+            self.apply(lambda tables: tables[table].update_flags(guild_id, set_bits=FLAG_AUTO_DELETE))
+        else:
+            self.apply(lambda tables: tables[table].update_flags(guild_id, clear_bits=FLAG_AUTO_DELETE))
+
+    def set_mutes(self, table: str, guild_id: int, mutes: FrozenSet[str]):
+        all_mutes = mute_flags(table, MUTE_COLUMNS[table])
+        self.apply(lambda tables: tables[table].update_flags(guild_id, set_bits=mute_flags(table, mutes), clear_bits=all_mutes))
+
+    def configure(self, table: str, guild_id: int, auto_delete: bool, mutes: FrozenSet[str] = frozenset()):
+        # For a guild whose auto_delete and mute rows were written after it subscribed.
+        set_bits = FLAG_CONFIGURED | (FLAG_AUTO_DELETE if auto_delete else 0) | mute_flags(table, mutes)
+        clear_bits = FLAG_AUTO_DELETE | mute_flags(table, MUTE_COLUMNS[table])
+        self.apply(lambda tables: tables[table].update_flags(guild_id, set_bits=set_bits, clear_bits=clear_bits))
+
+    def remove_guild(self, guild_id: int, tables: Optional[Iterable[str]] = None):
+        names = list(tables) if tables is not None else list(SUBSCRIPTION_TABLES)
+
+        def remove(store: Dict[str, SubscriptionColumns]):
+            for table in names:
+                store[table].remove(guild_id)
+        self.apply(remove)
+
+    def remove_channels(self, table: str, channel_ids: Iterable[int]):
+        channel_ids = list(channel_ids)
+        self.apply(lambda tables: tables[table].remove_channels(channel_ids))
+
+    def guild_channels(self, guild_id: int) -> Set[int]:
+        channels = set()
+        for columns in self.tables.values():
+            position = columns.position(guild_id)
+            if position is not None:
+                channels.add(columns.channel_ids[position])
+        return channels
+
+    def nbytes(self) -> int:
+        return sum(columns.nbytes() for columns in self.tables.values())
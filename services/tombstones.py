@@ -0,0 +1,48 @@
+import datetime
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import BigInteger, any_, delete, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from models.tombstones import Base, ChannelTombstone
+
+# Consecutive alert runs a channel has to be missing for before its subscription is deleted.
+TOMBSTONE_MISSES = 3
+TOMBSTONE_CHUNK = 5000
+
+
+class TombstoneRegistry:
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.misses: Dict[Tuple[str, int], int] = {}
+
+    async def setup(self):
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            rows = await conn.execute(select(ChannelTombstone.alert_table, ChannelTombstone.channel_id, ChannelTombstone.misses))
+            self.misses = {(table, channel_id): misses for table, channel_id, misses in rows.all()}
+
+    async def miss(self, table: str, channel_ids: Iterable[int]) -> List[int]:
+        """Record one more missed run for each channel and return those that have now missed too many in a row."""
+        channel_ids = list(set(channel_ids))
+        if not channel_ids:
+            return []
+        now = datetime.datetime.now(datetime.timezone.utc)
+        async with self.engine.begin() as conn:
+            for i in range(0, len(channel_ids), TOMBSTONE_CHUNK):
+                chunk = channel_ids[i:i+TOMBSTONE_CHUNK]
+                stmt = insert(ChannelTombstone).values([{'alert_table': table, 'channel_id': channel_id, 'misses': 1, 'last_miss': now} for channel_id in chunk])
+                stmt = stmt.on_conflict_do_update(constraint='channel_tombstones_unique_table_channel', set_={'misses': ChannelTombstone.misses + 1, 'last_miss': stmt.excluded.last_miss})
+                rows = await conn.execute(stmt.returning(ChannelTombstone.channel_id, ChannelTombstone.misses))
+                for channel_id, misses in rows.all():
+                    self.misses[(table, channel_id)] = misses
+        return [channel_id for channel_id in channel_ids if self.misses.get((table, channel_id), 0) >= TOMBSTONE_MISSES]
+
+    async def clear(self, table: str, channel_ids: Iterable[int]):
+        # Nearly every channel resolves on every run, so only go to the database for ones with a tombstone.
+        cleared = [channel_id for channel_id in channel_ids if self.misses.pop((table, channel_id), None) is not None]
+        if not cleared:
+            return
+        async with self.engine.begin() as conn:
+            await conn.execute(delete(ChannelTombstone).where(ChannelTombstone.alert_table == table, ChannelTombstone.channel_id == any_(literal(cleared, ARRAY(BigInteger)))))
@@ -0,0 +1,99 @@
+import traceback
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import discord
+from discord.ext import commands
+from dotenv import dotenv_values
+from sqlalchemy import BigInteger, any_, delete, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+
+from models.webhooks import AlertWebhook, Base, WebhookIdentity
+
+config = dotenv_values(".env")
+
+WEBHOOK_DELIVERY = (config.get("WEBHOOK_DELIVERY") or '').lower() == 'true'
+
+
+class WebhookRegistry:
+    def __init__(self, bot: commands.Bot, enabled: bool = WEBHOOK_DELIVERY):
+        self.bot = bot
+        self.enabled = enabled
+        self.hooks: Dict[int, discord.Webhook] = {}
+        # channel_id -> guild_id, so a guild's webhooks can be found when its alerts move.
+        self.owners: Dict[int, int] = {}
+        # guild_id -> (username, avatar_url) sent with each of the guild's alerts, in place of the bot's.
+        self.identities: Dict[int, Tuple[Optional[str], Optional[str]]] = {}
+
+    async def load(self):
+        async with self.bot.engine.begin() as conn: # type: ignore
+            await conn.run_sync(Base.metadata.create_all)
+            if not self.enabled:
+                return
+            webhooks = await conn.execute(select(AlertWebhook.guild_id, AlertWebhook.channel_id, AlertWebhook.webhook_id, AlertWebhook.webhook_token))
+            webhooks = webhooks.all()
+            identities = await conn.execute(select(WebhookIdentity.guild_id, WebhookIdentity.username, WebhookIdentity.avatar_url))
+            self.identities = {guild_id: (username, avatar_url) for guild_id, username, avatar_url in identities.all()}
+        self.hooks = {channel_id: discord.Webhook.partial(webhook_id, webhook_token, client=self.bot) for _, channel_id, webhook_id, webhook_token in webhooks}
+        self.owners = {channel_id: guild_id for guild_id, channel_id, _, _ in webhooks}
+
+    def get(self, channel_id: int) -> Optional[discord.Webhook]:
+        if not self.enabled:
+            return None
+        return self.hooks.get(channel_id)
+
+    def identity(self, guild_id: int) -> Tuple[Optional[str], Optional[str]]:
+        # Webhook messages take a username and avatar per send, so a custom identity costs no extra request.
+        return self.identities.get(guild_id, (None, None))
+
+    async def set_identity(self, guild_id: int, username: Optional[str], avatar_url: Optional[str]):
+        async with self.bot.engine.begin() as conn: # type: ignore
+            if username is None and avatar_url is None:
+                await conn.execute(delete(WebhookIdentity).filter_by(guild_id=guild_id))
+            else:
+                insert_stmt = insert(WebhookIdentity).values(guild_id=guild_id, username=username, avatar_url=avatar_url)
+                update = insert_stmt.on_conflict_do_update(constraint='webhook_identities_unique_guildid', set_={'username': username, 'avatar_url': avatar_url})
+                await conn.execute(update)
+        if username is None and avatar_url is None:
+            self.identities.pop(guild_id, None)
+        else:
+            self.identities[guild_id] = (username, avatar_url)
+
+    async def ensure(self, channel: discord.abc.GuildChannel):
+        # Webhooks are optional, so a failure here must never abort the setup command that called it.
+        if not self.enabled or not isinstance(channel, discord.TextChannel):
+            return
+        try:
+            await self.release_unused(channel.guild.id)
+            if channel.id in self.hooks or not channel.permissions_for(channel.guild.me).manage_webhooks:
+                return
+            avatar = await self.bot.user.display_avatar.read() # type: ignore
+            webhook = await channel.create_webhook(name=self.bot.user.name, avatar=avatar, reason="Alert delivery") # type: ignore
+            async with self.bot.engine.begin() as conn: # type: ignore
+                insert_stmt = insert(AlertWebhook).values(guild_id=channel.guild.id, channel_id=channel.id, webhook_id=webhook.id, webhook_token=webhook.token)
+                update = insert_stmt.on_conflict_do_update(constraint='alert_webhooks_unique_channelid', set_={'webhook_id': webhook.id, 'webhook_token': webhook.token})
+                await conn.execute(update)
+            self.hooks[channel.id] = webhook
+            self.owners[channel.id] = channel.guild.id
+        except Exception as e:
+            traceback.print_exception(type(e), e, e.__traceback__)
+
+    async def release_unused(self, guild_id: int):
+        # Called after the subscription store is updated, so a channel an alert just moved away from is no longer in use.
+        in_use = self.bot.subscriptions.guild_channels(guild_id) # type: ignore
+        stale: List[int] = [channel_id for channel_id, owner in self.owners.items() if owner == guild_id and channel_id not in in_use]
+        for channel_id in stale:
+            try:
+                await self.hooks[channel_id].delete(reason="Alert channel changed")
+            except discord.HTTPException as e:
+                # Already deleted in Discord, or the bot lost Manage Webhooks; the registry row goes either way.
+                traceback.print_exception(type(e), e, e.__traceback__)
+        await self.discard(stale)
+
+    async def discard(self, channel_ids: Iterable[int]):
+        channel_ids = [channel_id for channel_id in channel_ids if self.hooks.pop(channel_id, None) is not None]
+        for channel_id in channel_ids:
+            self.owners.pop(channel_id, None)
+        if not channel_ids:
+            return
+        async with self.bot.engine.begin() as conn: # type: ignore
+            await conn.execute(delete(AlertWebhook).where(AlertWebhook.channel_id == any_(literal(channel_ids, ARRAY(BigInteger)))))